@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Throughput benchmark of the plugin to VNF manager RPC path.
+
+The plugin RPC callbacks and a synthetic VNF manager run in this process
+over the oslo.messaging fake driver. Each service is sent its VDUs with
+configure_vdus, the synthetic manager acknowledges every instance back
+with send_acks (or send_ack with --single-acks).
+
+The fake driver polls its queues, sleeping between polls, so wall times
+through it mostly measure that sleep. The plugin side is therefore timed
+on its own: the time taken to send configure_vdus and the time taken to
+handle each ack message. Reported are the messages per second handled by
+the plugin, the percentiles of those handler times, and for reference
+the wall time of the run and the latency from configure_vdus to the last
+ack of each service.
+
+With --baseline the run fails (exit code 1) when the plugin throughput
+is lower, or the 95th percentile ack handler time higher, than the
+baseline by more than --tolerance. --save-baseline writes the results of
+the run as baseline.
+
+    python tools/rpc_benchmark.py --services 50 --vdus 10 --instances 2
+"""
+
+import argparse
+import json
+import sys
+import uuid
+
+import eventlet
+eventlet.monkey_patch()
+from eventlet import event
+
+from oslo.config import cfg
+
+from vnfsvc import context
+from vnfsvc import plugin
+from vnfsvc.common import rpc as v_rpc
+from vnfsvc.common import topics
+from vnfsvc.common import utils
+
+VNFD = 'bench'
+
+
+class BenchPlugin(plugin.VNFPlugin):
+    """Plugin tracking acknowledgements only, without clients or database."""
+
+    def __init__(self):
+        self.ns_dict = {}
+        self.pending = {}
+        self.ack_times = []
+
+    def add_service(self, nsd_id, vdus, instances):
+        self.ns_dict[nsd_id] = {
+            'vnfmanager_uuid': str(uuid.uuid4()),
+            'vnfds': {VNFD: {'vdus': dict(
+                ('vdu%d' % vdu, {'instances': ['%s-%d-%d' % (nsd_id, vdu, i)
+                                               for i in range(instances)]})
+                for vdu in range(vdus))}},
+            'acknowledge_list': {},
+            'created': [],
+        }
+        self.pending[nsd_id] = event.Event()
+
+    def build_acknowledge_lists(self, context, nsd_id, acks):
+        started_at = utils.monotonic()
+        super(BenchPlugin, self).build_acknowledge_lists(context, nsd_id,
+                                                         acks)
+        self.ack_times.append(utils.monotonic() - started_at)
+        service = self.ns_dict[nsd_id]
+        if len(service['created']) == len(service['vnfds'][VNFD]['vdus']):
+            self.pending.pop(nsd_id).send(utils.monotonic())
+
+
+class BenchPluginApi(v_rpc.RpcProxy):
+    """VNF manager side of the VNF manager to plugin RPC API."""
+
+    API_VERSION = '1.2'
+
+    def __init__(self):
+        super(BenchPluginApi, self).__init__(topics.PLUGIN_CONTROL,
+                                             self.API_VERSION)
+
+    def send_ack(self, context, vnfd, vdu, instance, status, nsd_id):
+        return self.cast(
+            context,
+            self.make_msg('send_ack', vnfd=vnfd, vdu=vdu, instance=instance,
+                          status=status, nsd_id=nsd_id),
+            version='1.0',
+        )
+
+    def send_acks(self, context, nsd_id, acks):
+        return self.cast(
+            context,
+            self.make_msg('send_acks', nsd_id=nsd_id, acks=acks),
+        )
+
+
+class SyntheticManager(v_rpc.RpcCallback):
+    """Acknowledges every instance of the VDUs it is configured with."""
+
+    RPC_API_VERSION = '1.1'
+
+    def __init__(self, bench_plugin, single_acks):
+        super(SyntheticManager, self).__init__()
+        self.plugin = bench_plugin
+        self.single_acks = single_acks
+        self.plugin_api = BenchPluginApi()
+
+    def configure_vdus(self, context, conf):
+        nsd_id = conf['service']['nsd_id']
+        vdus = self.plugin.ns_dict[nsd_id]['vnfds'][VNFD]['vdus']
+        for vdu_dict in conf['service'].get(VNFD, []):
+            instances = vdus[vdu_dict['name']]['instances']
+            if self.single_acks:
+                for instance in instances:
+                    self.plugin_api.send_ack(context, VNFD, vdu_dict['name'],
+                                             instance, 'COMPLETE', nsd_id)
+            else:
+                self.plugin_api.send_acks(
+                    context, nsd_id,
+                    [(VNFD, vdu_dict['name'], instance, 'COMPLETE')
+                     for instance in instances])
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = int(round(percent / 100.0 * (len(values) - 1)))
+    return values[index]
+
+
+def _rate(count, seconds):
+    # None when the clock did not advance, too small a run to measure
+    return count / seconds if seconds > 0 else None
+
+
+def run(args):
+    bench_plugin = BenchPlugin()
+    nsd_ids = [str(uuid.uuid4()) for i in range(args.services)]
+    for nsd_id in nsd_ids:
+        bench_plugin.add_service(nsd_id, args.vdus, args.instances)
+
+    conn = v_rpc.create_connection(new=True)
+    conn.create_consumer(topics.PLUGIN_CONTROL,
+                         [plugin.VNFManagerCallbacks(bench_plugin)],
+                         workers=args.control_workers)
+    manager = SyntheticManager(bench_plugin, args.single_acks)
+    for nsd_id in nsd_ids:
+        conn.create_consumer(topics.get_topic_for_mgr(
+            bench_plugin.ns_dict[nsd_id]['vnfmanager_uuid']), [manager])
+    servers = conn.consume_in_threads()
+
+    ctx = context.get_admin_context_without_session()
+    send_times = []
+
+    def _configure(nsd_id):
+        agent_api = plugin.VNFManagerAgentApi(
+            topics.get_topic_for_mgr(
+                bench_plugin.ns_dict[nsd_id]['vnfmanager_uuid']),
+            cfg.CONF.host, bench_plugin)
+        conf = {'service': {'nsd_id': nsd_id, VNFD: [
+            {'name': vdu, 'payload': 'x' * args.payload_size}
+            for vdu in bench_plugin.ns_dict[nsd_id]['vnfds'][VNFD]['vdus']]}}
+        acknowledged = bench_plugin.pending[nsd_id]
+        started_at = utils.monotonic()
+        agent_api.configure_vdus(ctx, conf=conf)
+        send_times.append(utils.monotonic() - started_at)
+        return acknowledged.wait() - started_at
+
+    pool = eventlet.GreenPool(args.concurrency)
+    started_at = utils.monotonic()
+    with eventlet.Timeout(args.timeout):
+        latencies = list(pool.imap(_configure, nsd_ids))
+    duration = utils.monotonic() - started_at
+    for server in servers:
+        server.stop()
+
+    ack_times = bench_plugin.ack_times
+    messages = len(send_times) + len(ack_times)
+    return {
+        'services': args.services,
+        'vdus': args.vdus,
+        'instances': args.instances,
+        'single_acks': args.single_acks,
+        'messages': messages,
+        'handler_time': sum(send_times) + sum(ack_times),
+        'messages_per_second': _rate(messages,
+                                     sum(send_times) + sum(ack_times)),
+        'send_p50': _percentile(send_times, 50),
+        'send_p95': _percentile(send_times, 95),
+        'ack_handler_p50': _percentile(ack_times, 50),
+        'ack_handler_p95': _percentile(ack_times, 95),
+        'ack_handler_max': max(ack_times),
+        'wall_duration': duration,
+        'wall_messages_per_second': _rate(messages, duration),
+        'wall_latency_p50': _percentile(latencies, 50),
+        'wall_latency_p95': _percentile(latencies, 95),
+    }
+
+
+def check(results, baseline, tolerance):
+    """Returns the regressions of results against baseline."""
+    failures = []
+    if results['messages_per_second'] and baseline['messages_per_second']:
+        min_rate = baseline['messages_per_second'] * (1 - tolerance)
+        if results['messages_per_second'] < min_rate:
+            failures.append('throughput %.1f msg/s below %.1f msg/s' %
+                            (results['messages_per_second'], min_rate))
+    max_time = baseline['ack_handler_p95'] * (1 + tolerance)
+    if results['ack_handler_p95'] > max_time:
+        failures.append('p95 ack handler time %.6fs above %.6fs' %
+                        (results['ack_handler_p95'], max_time))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=20)
+    parser.add_argument('--vdus', type=int, default=5,
+                        help='VDUs per service')
+    parser.add_argument('--instances', type=int, default=1,
+                        help='instances per VDU')
+    parser.add_argument('--payload-size', type=int, default=1024,
+                        help='bytes of configuration per VDU')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='services configured at once')
+    parser.add_argument('--single-acks', action='store_true',
+                        help='acknowledge with one send_ack per instance')
+    parser.add_argument('--control-workers', type=int, default=0,
+                        help='acks handled at once, 0 for no limit')
+    parser.add_argument('--timeout', type=int, default=300)
+    parser.add_argument('--baseline', help='baseline results to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed regression against the baseline')
+    parser.add_argument('--save-baseline',
+                        help='file to write the results to')
+    args = parser.parse_args()
+
+    cfg.CONF(args=[], project='vnfsvc', default_config_files=[])
+    v_rpc.init(cfg.CONF, url='fake:///')
+    try:
+        results = run(args)
+    finally:
+        v_rpc.cleanup()
+
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = check(results, json.load(f), args.tolerance)
+        for failure in failures:
+            sys.stderr.write('Regression: %s\n' % failure)
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Command execution and file copies on remote hosts.
+
+SSHExecutor keeps one multiplexed OpenSSH connection (ControlMaster) per
+host, so that the commands and copies following the first one skip the
+SSH handshake and authentication. LocalExecutor has the same interface
+and runs everything in a local shell, standing in for a remote host
+(remote_executor = local). Paths relative to the home directory on the
+host are relative to the root of a LocalExecutor.
+"""
+
+import os
+import pipes
+import shutil
+
+from vnfsvc.agent.linux import utils
+
+
+class SSHExecutor(object):
+    """Runs commands on host over a persistent SSH connection.
+
+    :param control_dir: directory of the control sockets, keep its path
+                        short, sockets paths are limited to 108 bytes
+    :param persist: seconds the connection is kept open once idle
+    :param password: used, through sshpass, when no key_file is given
+    :param timeout: seconds each command or copy is given
+    """
+
+    def __init__(self, host, user, control_dir, key_file=None,
+                 password=None, persist=600, timeout=None):
+        self.host = host
+        self.user = user
+        self.control_dir = control_dir
+        self.key_file = key_file
+        self.password = password
+        self.persist = persist
+        self.timeout = timeout
+
+    @property
+    def _control_path(self):
+        return '%s/%s@%s' % (self.control_dir, self.user, self.host)
+
+    def _key_options(self):
+        if self.key_file:
+            return ['-i', self.key_file, '-o', 'BatchMode=yes']
+        return []
+
+    def _options(self):
+        # Commands only attach to the master connection, a master started
+        # by them would keep their output open once in the background.
+        return ['-o', 'ControlMaster=no',
+                '-o', 'ControlPath=%s' % self._control_path] + \
+            self._key_options()
+
+    def _master_running(self):
+        """Tells if the master connection answers on its control socket.
+
+        A socket left behind by a master which died is removed.
+        """
+        if not os.path.exists(self._control_path):
+            return False
+        try:
+            # Only talks to the local master, no authentication is needed
+            utils.execute_streamed(
+                ['ssh', '-o', 'ControlPath=%s' % self._control_path,
+                 '-O', 'check', '%s@%s' % (self.user, self.host)],
+                timeout=self.timeout)
+        except RuntimeError:
+            try:
+                os.remove(self._control_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def _start_master(self):
+        """Starts the master connection, unless it is running."""
+        if self._master_running():
+            return
+        options = ['-o', 'ControlPath=%s' % self._control_path,
+                   '-o', 'ControlPersist=%d' % self.persist] + \
+            self._key_options()
+        # ssh -f returns once authenticated, its output is discarded so
+        # that the master left in the background holds no pipe of ours.
+        self._execute(['sh', '-c', 'exec "$@" > /dev/null 2>&1', 'ssh',
+                       'ssh', '-M', '-N', '-f'] + options +
+                      ['%s@%s' % (self.user, self.host)])
+
+    def _execute(self, cmd, check_exit_code=True):
+        env = None
+        if self.password and not self.key_file:
+            cmd = ['sshpass', '-e'] + cmd
+            env = {'SSHPASS': self.password}
+        return utils.execute_streamed(cmd, timeout=self.timeout,
+                                      addl_env=env,
+                                      check_exit_code=check_exit_code)
+
+    def run(self, command, check_exit_code=True):
+        """Runs the shell command on the host, returns its output lines."""
+        self._start_master()
+        return self._execute(['ssh'] + self._options() +
+                             ['%s@%s' % (self.user, self.host), command],
+                             check_exit_code=check_exit_code)
+
+    def copy(self, sources, dest_dir):
+        """Copies the local files sources into dest_dir, in one transfer."""
+        self.run('mkdir -p %s' % pipes.quote(dest_dir))
+        self._execute(['scp', '-q'] + self._options() + list(sources) +
+                      ['%s@%s:%s/' % (self.user, self.host, dest_dir)])
+
+    def close(self):
+        """Closes the persistent connection, if any."""
+        if not os.path.exists(self._control_path):
+            return
+        self._execute(['ssh'] + self._options() +
+                      ['-O', 'exit', '%s@%s' % (self.user, self.host)],
+                      check_exit_code=False)
+
+
+class LocalExecutor(object):
+    """Runs commands in a local shell, from the root directory."""
+
+    def __init__(self, root=None, timeout=None):
+        self.host = 'localhost'
+        self.root = root or os.path.expanduser('~')
+        self.timeout = timeout
+
+    def run(self, command, check_exit_code=True):
+        return utils.execute_streamed(
+            ['sh', '-c', 'cd %s && %s' % (pipes.quote(self.root), command)],
+            timeout=self.timeout, check_exit_code=check_exit_code)
+
+    def copy(self, sources, dest_dir):
+        dest_dir = os.path.join(self.root, dest_dir)
+        if not os.path.exists(dest_dir):
+            os.makedirs(dest_dir)
+        for source in sources:
+            shutil.copy(source, dest_dir)
+
+    def close(self):
+        pass
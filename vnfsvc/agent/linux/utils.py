@@ -25,6 +25,7 @@ import struct
 import tempfile
 import signal
 
+import eventlet
 from eventlet.green import subprocess
 from eventlet import greenthread
 
@@ -95,3 +96,41 @@ def execute(cmd, root_helper=None, process_input=None, addl_env=None,
         greenthread.sleep(0)
 
     return return_stderr and (_stdout, _stderr) or _stdout
+
+
+def execute_streamed(cmd, timeout=None, addl_env=None, check_exit_code=True):
+    """Runs cmd, logging its output lines as they are written.
+
+    Only the calling greenthread waits for the command, which is killed
+    after timeout seconds. Returns the output lines, stderr included.
+    """
+    cmd = map(str, cmd)
+    LOG.debug(_("Running command: %s"), cmd)
+    env = os.environ.copy()
+    if addl_env:
+        env.update(addl_env)
+    obj = subprocess_popen(cmd, shell=False,
+                           stdin=subprocess.PIPE,
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT,
+                           env=env)
+    obj.stdin.close()
+
+    lines = []
+    with eventlet.Timeout(timeout, False):
+        for line in iter(obj.stdout.readline, ''):
+            line = line.rstrip('\n')
+            LOG.debug("%(cmd)s: %(line)s", {'cmd': cmd[0], 'line': line})
+            lines.append(line)
+        obj.wait()
+    if obj.returncode is None:
+        obj.kill()
+        obj.wait()
+        raise RuntimeError(_("Command %(cmd)s timed out after %(timeout)ss")
+                           % {'cmd': cmd, 'timeout': timeout})
+    if obj.returncode and check_exit_code:
+        raise RuntimeError(_("\nCommand: %(cmd)s\nExit code: %(code)s\n"
+                             "Output: %(output)r") %
+                           {'cmd': cmd, 'code': obj.returncode,
+                            'output': '\n'.join(lines)})
+    return lines
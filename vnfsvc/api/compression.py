@@ -0,0 +1,177 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compression of API responses negotiated with Accept-Encoding."""
+
+import zlib
+
+from oslo.config import cfg
+
+from vnfsvc.openstack.common.gettextutils import _
+from vnfsvc import wsgi
+
+compression_opts = [
+    cfg.IntOpt('api_compression_min_size', default=1024,
+               help=_("Responses smaller than this many bytes are sent "
+                      "uncompressed")),
+    cfg.IntOpt('api_compression_level', default=6,
+               help=_("zlib compression level of API responses, 1 (fast) "
+                      "to 9 (small)")),
+]
+cfg.CONF.register_opts(compression_opts)
+
+# Content types which are compressed already
+_COMPRESSED_TYPES = ('image/', 'video/', 'audio/', 'application/zip',
+                     'application/gzip', 'application/x-gzip',
+                     'application/x-bzip2', 'application/x-xz')
+
+# Window bits selecting the gzip and zlib (HTTP deflate) containers
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS,
+          'deflate': zlib.MAX_WBITS}
+
+
+def choose_encoding(accept_encoding):
+    """Returns 'gzip', 'deflate' or None for an Accept-Encoding value."""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        params = item.split(';')
+        coding = params[0].strip().lower()
+        quality = 1.0
+        for param in params[1:]:
+            name, _sep, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    for coding in ('gzip', 'deflate'):
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware(wsgi.Middleware):
+    """Compresses responses with gzip or deflate.
+
+    Bodies are compressed as they are produced, so streamed responses
+    stay streamed. Bodies of unknown length are buffered only until
+    api_compression_min_size bytes are seen; smaller bodies, bodies
+    already encoded and compressed media types are passed through.
+    """
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if not encoding or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.application(environ, start_response)
+
+        response = {}
+        pending = []
+
+        def _start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+            response['exc_info'] = exc_info
+            return pending.append
+
+        app_iter = self.application(environ, _start_response)
+        return self._iter(app_iter, encoding, response, pending,
+                          start_response)
+
+    def _compressible(self, status, headers):
+        if status[:3] in ('204', '304'):
+            return False
+        min_size = cfg.CONF.api_compression_min_size
+        for name, value in headers:
+            name = name.lower()
+            if name == 'content-encoding':
+                return False
+            if name == 'content-type' and value.lower().startswith(
+                    _COMPRESSED_TYPES):
+                return False
+            if name == 'content-length' and int(value) < min_size:
+                return False
+        return True
+
+    def _iter(self, app_iter, encoding, response, pending, start_response):
+        try:
+            chunks = iter(app_iter)
+            buffered = list(pending)
+            size = sum(len(chunk) for chunk in buffered)
+            compress = None
+            # start_response may be called as late as the first chunk
+            for chunk in chunks:
+                if chunk:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                if size >= cfg.CONF.api_compression_min_size:
+                    break
+            else:
+                # The whole body is smaller than the threshold
+                start_response(response['status'], response['headers'],
+                               response['exc_info'])
+                if buffered:
+                    yield ''.join(buffered)
+                return
+
+            if self._compressible(response['status'], response['headers']):
+                compress = zlib.compressobj(
+                    cfg.CONF.api_compression_level, zlib.DEFLATED,
+                    _WBITS[encoding])
+                start_response(response['status'],
+                               self._headers(response['headers'], encoding),
+                               response['exc_info'])
+            else:
+                start_response(response['status'], response['headers'],
+                               response['exc_info'])
+
+            if compress is None:
+                for chunk in buffered:
+                    yield chunk
+                for chunk in chunks:
+                    yield chunk
+                return
+
+            data = compress.compress(''.join(buffered))
+            if data:
+                yield data
+            for chunk in chunks:
+                data = compress.compress(chunk)
+                if data:
+                    yield data
+            yield compress.flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def _headers(self, headers, encoding):
+        result = []
+        vary = None
+        for name, value in headers:
+            lname = name.lower()
+            if lname == 'content-length':
+                continue
+            if lname == 'etag' and not value.startswith('W/'):
+                # The compressed body is a different representation
+                value = 'W/' + value
+            if lname == 'vary':
+                vary = value
+                continue
+            result.append((name, value))
+        if vary and 'accept-encoding' not in vary.lower():
+            vary = vary + ', Accept-Encoding'
+        result.append(('Vary', vary or 'Accept-Encoding'))
+        result.append(('Content-Encoding', encoding))
+        return result
@@ -0,0 +1,231 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""API request metrics in the Prometheus text exposition format.
+
+MetricsMiddleware records latency and response size histograms and
+status counts per route and method, and the requests in flight.
+MetricsApp renders them, with the utilization of the WSGI server pools,
+the SQL statement and the RPC statistics, for scraping. Metrics are kept per
+process.
+"""
+
+import collections
+
+import webob
+import webob.dec
+
+from vnfsvc.common import histogram
+from vnfsvc.common import rpc_instrumentation
+from vnfsvc.common import utils
+from vnfsvc.db import instrumentation as db_instrumentation
+from vnfsvc import wsgi
+
+# Label of requests which did not match any API route
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Registry(object):
+
+    def __init__(self):
+        self.in_flight = 0
+        self.latency = collections.defaultdict(
+            lambda: histogram.Histogram(histogram.LATENCY_BUCKETS))
+        self.size = collections.defaultdict(
+            lambda: histogram.Histogram(histogram.SIZE_BUCKETS))
+        self.statuses = collections.defaultdict(int)
+
+    def observe(self, method, route, status, duration, size):
+        self.latency[(method, route)].observe(duration)
+        self.size[(method, route)].observe(size)
+        self.statuses[(method, route, status)] += 1
+
+
+REGISTRY = Registry()
+
+
+class _MeteredIter(object):
+    """Counts the bytes of a response body, recording it once closed."""
+
+    def __init__(self, app_iter, on_close):
+        self._app_iter = app_iter
+        self._on_close = on_close
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self._app_iter:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, 'close'):
+                self._app_iter.close()
+        finally:
+            self._on_close(self.size)
+
+
+class MetricsMiddleware(wsgi.Middleware):
+    """Records the latency, size and status of the API responses.
+
+    Latency runs until the response body has been sent, so streamed
+    collections are measured as a whole.
+    """
+
+    def __call__(self, environ, start_response):
+        started_at = utils.monotonic()
+        status = ['500']
+
+        def _start_response(status_line, headers, exc_info=None):
+            status[0] = status_line.split(' ', 1)[0]
+            return start_response(status_line, headers, exc_info)
+
+        def _record(size):
+            REGISTRY.in_flight -= 1
+            route = getattr(environ.get('routes.route'), 'routepath',
+                            UNMATCHED_ROUTE)
+            REGISTRY.observe(environ.get('REQUEST_METHOD', ''), route,
+                             status[0], utils.monotonic() - started_at, size)
+
+        REGISTRY.in_flight += 1
+        try:
+            app_iter = self.application(environ, _start_response)
+        except Exception:
+            _record(0)
+            raise
+        return _MeteredIter(app_iter, _record)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"').
+            replace('\n', '\\n'))
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % (key, _escape(value))
+                             for key, value in sorted(labels.iteritems()))
+
+
+def _header(lines, name, kind, text):
+    lines.append('# HELP %s %s' % (name, text))
+    lines.append('# TYPE %s %s' % (name, kind))
+
+
+def _histogram(lines, name, text, histograms, keys=('method', 'route')):
+    _header(lines, name, 'histogram', text)
+    for key, values in sorted(histograms.iteritems()):
+        labels = dict(zip(keys, key))
+        for le, count in values.samples():
+            lines.append('%s_bucket%s %d' % (
+                name, _labels(le=le, **labels), count))
+        labels = _labels(**labels)
+        lines.append('%s_sum%s %r' % (name, labels, float(values.sum)))
+        lines.append('%s_count%s %d' % (name, labels, values.count))
+
+
+def _counter(lines, name, text, counts, keys):
+    _header(lines, name, 'counter', text)
+    for key, count in sorted(counts.iteritems()):
+        lines.append('%s%s %d' % (name, _labels(**dict(zip(keys, key))),
+                                  count))
+
+
+def render(registry=REGISTRY):
+    """Returns the metrics in the Prometheus text format."""
+    lines = []
+    _header(lines, 'vnfsvc_http_requests_in_flight', 'gauge',
+            'API requests being processed.')
+    lines.append('vnfsvc_http_requests_in_flight %d' % registry.in_flight)
+
+    _histogram(lines, 'vnfsvc_http_request_duration_seconds',
+               'API request latency.', registry.latency)
+    _histogram(lines, 'vnfsvc_http_response_size_bytes',
+               'API response body size.', registry.size)
+
+    _header(lines, 'vnfsvc_http_responses_total', 'counter',
+            'API responses by status code.')
+    for (method, route, status), count in sorted(
+            registry.statuses.iteritems()):
+        lines.append('vnfsvc_http_responses_total%s %d' % (
+            _labels(method=method, route=route, status=status), count))
+
+    servers = wsgi.get_servers()
+    for name, kind, text, value in (
+            ('vnfsvc_wsgi_pool_size', 'gauge',
+             'Greenthreads of the WSGI server pool.',
+             lambda pool: pool.size),
+            ('vnfsvc_wsgi_pool_running', 'gauge',
+             'Greenthreads of the WSGI server pool in use.',
+             lambda pool: pool.running()),
+            ('vnfsvc_wsgi_pool_waiting', 'gauge',
+             'Connections waiting for a free greenthread.',
+             lambda pool: pool.waiting())):
+        _header(lines, name, kind, text)
+        for server in servers:
+            lines.append('%s%s %d' % (name, _labels(server=server.name),
+                                      value(server.pool)))
+
+    stats = db_instrumentation.get_stats()
+    _header(lines, 'vnfsvc_sql_statements_total', 'counter',
+            'SQL statements run by API requests and RPC callbacks.')
+    for scope, totals in sorted(stats['scopes'].iteritems()):
+        lines.append('vnfsvc_sql_statements_total%s %d' % (
+            _labels(scope=scope), totals['statements']))
+    _header(lines, 'vnfsvc_sql_duration_seconds_total', 'counter',
+            'Time spent running SQL statements.')
+    for scope, totals in sorted(stats['scopes'].iteritems()):
+        lines.append('vnfsvc_sql_duration_seconds_total%s %r' % (
+            _labels(scope=scope), float(totals['duration'])))
+    _header(lines, 'vnfsvc_db_pool_checkouts_total', 'counter',
+            'Database connections checked out of the pool.')
+    lines.append('vnfsvc_db_pool_checkouts_total %d' %
+                 stats['pool']['checkouts'])
+    _header(lines, 'vnfsvc_db_pool_wait_seconds_total', 'counter',
+            'Time spent waiting for a database connection.')
+    lines.append('vnfsvc_db_pool_wait_seconds_total %r' %
+                 float(stats['pool']['wait_total']))
+
+    rpc = rpc_instrumentation.STATS
+    rpc_keys = ('kind', 'method')
+    _counter(lines, 'vnfsvc_rpc_messages_total',
+             'RPC messages sent and dispatched.', rpc.messages, rpc_keys)
+    _counter(lines, 'vnfsvc_rpc_errors_total',
+             'RPC messages which failed to be sent or handled.', rpc.errors,
+             rpc_keys)
+    _histogram(lines, 'vnfsvc_rpc_duration_seconds',
+               'RPC call latency, time to send casts and to handle '
+               'dispatched messages.', rpc.duration, rpc_keys)
+    _histogram(lines, 'vnfsvc_rpc_queue_delay_seconds',
+               'Time from sending to dispatching an RPC message.',
+               rpc.queue_delay, rpc_keys)
+    _histogram(lines, 'vnfsvc_rpc_payload_size_bytes',
+               'RPC message arguments size, JSON encoded, on a sample of '
+               'the messages.', rpc.size, rpc_keys)
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsApp(object):
+    """Serves the metrics of this process, without authentication."""
+
+    @classmethod
+    def factory(cls, global_config, **local_config):
+        return cls()
+
+    @webob.dec.wsgify(RequestClass=wsgi.Request)
+    def __call__(self, req):
+        response = webob.Response()
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4'
+        response.body = render()
+        return response
@@ -14,7 +14,10 @@
 #    under the License.
 
 import copy
+import hashlib
+import itertools
 import netaddr
+import urllib
 import webob.exc
 
 from oslo.config import cfg
@@ -30,9 +33,15 @@ from vnfsvc.openstack.common.gettextutils import _
 
 LOG = logging.getLogger(__name__)
 
+# Query parameters of a show request parking it until the resource changes
+WATCH_PARAMS = ('wait_for_change', 'timeout')
+# Request environ key set once the request waited for a change
+WATCHED = 'vnfsvc.watched'
+
 FAULT_MAP = {exceptions.NotFound: webob.exc.HTTPNotFound,
              exceptions.Conflict: webob.exc.HTTPConflict,
              exceptions.InUse: webob.exc.HTTPConflict,
+             exceptions.OverLimit: webob.exc.HTTPTooManyRequests,
              exceptions.BadRequest: webob.exc.HTTPBadRequest,
              exceptions.ServiceUnavailable: webob.exc.HTTPServiceUnavailable,
              exceptions.NotAuthorized: webob.exc.HTTPForbidden,
@@ -64,6 +73,8 @@ class Controller(object):
         self._native_sorting = self._is_native_sorting_supported()
         self._policy_attrs = [name for (name, info) in self._attr_info.items()
                               if info.get('required_by_policy')]
+        self._create_plan = ValidationPlan(self._attr_info, True)
+        self._update_plan = ValidationPlan(self._attr_info, False)
         self._notifier = n_rpc.get_notifier('vnfservice')
         self._member_actions = member_actions
         self._primary_key = self._get_primary_key()
@@ -91,6 +102,12 @@ class Controller(object):
         for action in [self.CREATE, self.UPDATE, self.DELETE]:
             self._plugin_handlers[action] = '%s%s_%s' % (action, parent_part,
                                                          self._resource)
+        # Optional plugin methods returning the revision of a resource or
+        # of the result of a listing, used to build ETags
+        self._revision_handlers = {
+            self.LIST: 'get%s_%s_revision' % (parent_part, self._collection),
+            self.SHOW: 'get%s_%s_revision' % (parent_part, self._resource)
+        }
 
     def _get_primary_key(self, default_primary_key='id'):
         for key, value in self._attr_info.iteritems():
@@ -222,29 +239,38 @@ class Controller(object):
             kwargs[self._parent_id_name] = parent_id
         obj_getter = getattr(self._plugin, self._plugin_handlers[self.LIST])
         obj_list = obj_getter(request.context, **kwargs)
+        # Plugins may return an iterator over the rows, it is passed on to
+        # the serializer unless it must be sorted or paginated here
+        streamed = (
+            isinstance(pagination_helper, api_common.NoPaginationHelper) and
+            not isinstance(sorting_helper, api_common.SortingEmulatedHelper))
+        if not streamed:
+            obj_list = list(obj_list)
         obj_list = sorting_helper.sort(obj_list)
         obj_list = pagination_helper.paginate(obj_list)
+        pagination_links = pagination_helper.get_links(obj_list)
         # Check authz
         if do_authz:
             # FIXME(salvatore-orlando): obj_getter might return references to
             # other resources. Must check authZ on them too.
             # Omit items from list that should not be visible
-            obj_list = [obj for obj in obj_list]
+            obj_list = (obj for obj in obj_list)
         # Use the first element in the list for discriminating which attributes
         # should be filtered out because of authZ policies
         # fields_to_add contains a list of attributes added for request policy
         # checks but that were not required by the user. They should be
         # therefore stripped
         fields_to_strip = fields_to_add or []
-        if obj_list:
+        obj_list = iter(obj_list)
+        first = next(obj_list, None)
+        if first is not None:
             fields_to_strip += self._exclude_attributes_by_policy(
-                request.context, obj_list[0])
-        collection = {self._collection:
-                      [self._filter_attributes(
-                          request.context, obj,
-                          fields_to_strip=fields_to_strip)
-                       for obj in obj_list]}
-        pagination_links = pagination_helper.get_links(obj_list)
+                request.context, first)
+            obj_list = itertools.chain([first], obj_list)
+        items = (self._filter_attributes(request.context, obj,
+                                         fields_to_strip=fields_to_strip)
+                 for obj in obj_list)
+        collection = {self._collection: items if streamed else list(items)}
         if pagination_links:
             collection[self._collection + "_links"] = pagination_links
         return collection
@@ -264,6 +290,66 @@ class Controller(object):
         return obj
 
 
+    def get_etag(self, request, action, id=None, **kwargs):
+        """Returns a strong ETag for the response of index or show.
+
+        The tag is derived from the revision reported by the plugin, the
+        query string selecting the fields and filters of the response and
+        the tenant and admin status of the requester, which scope what the
+        response holds. None is returned when the plugin does not report
+        revisions or the resource does not exist.
+        """
+        plugin_action = self.SHOW if action == 'show' else self.LIST
+        getter = getattr(self._plugin,
+                         self._revision_handlers[plugin_action], None)
+        if not getter:
+            return None
+        if plugin_action == self.SHOW:
+            self._wait_for_change(request, id)
+            revision = getter(request.context, id)
+        else:
+            filters = api_common.get_filters(
+                request, self._attr_info,
+                ['fields', 'sort_key', 'sort_dir', 'limit', 'marker',
+                 'page_reverse'])
+            revision = getter(request.context, filters=filters)
+        if revision is None:
+            return None
+        query = urllib.urlencode(sorted(
+            (key.encode('utf-8'), value.encode('utf-8'))
+            for key, value in request.GET.iteritems()
+            if key not in WATCH_PARAMS))
+        requester = '%s:%s' % (request.context.tenant_id,
+                               request.context.is_admin)
+        return hashlib.md5('%s:%s:%s:%s:%s' % (self._collection, id,
+                                               revision, query,
+                                               requester)).hexdigest()
+
+    def _wait_for_change(self, request, id):
+        """Parks a show request until the resource changes.
+
+        With ?wait_for_change=<revision>[&timeout=<seconds>] the request
+        is answered once the revision of the resource differs from the
+        given one, or when the timeout expires. A request waits once,
+        get_etag and show both call this.
+        """
+        revision = request.GET.get('wait_for_change')
+        if revision is None or request.environ.get(WATCHED):
+            return
+        waiter = getattr(self._plugin, 'wait_for_%s_change' % self._resource,
+                         None)
+        if not waiter:
+            return
+        timeout = request.GET.get('timeout')
+        try:
+            revision = int(revision)
+            timeout = float(timeout) if timeout is not None else None
+        except ValueError:
+            msg = _("wait_for_change and timeout must be numbers")
+            raise webob.exc.HTTPBadRequest(msg)
+        request.environ[WATCHED] = True
+        waiter(request.context, id, revision, timeout)
+
     def index(self, request, **kwargs):
         """Returns a list of the requested entity."""
         parent_id = kwargs.get(self._parent_id_name)
@@ -274,6 +360,8 @@ class Controller(object):
     def show(self, request, id, **kwargs):
         """Returns detailed information about the requested entity."""
         try:
+            # Returns at once if get_etag already waited
+            self._wait_for_change(request, id)
             # NOTE(salvatore-orlando): The following ensures that fields
             # which are needed for authZ policy validation are not stripped
             # away by the plugin before returning.
@@ -335,7 +423,8 @@ class Controller(object):
                             body)
         body = Controller.prepare_request_body(request.context, body, True,
                                                self._resource, self._attr_info,
-                                               allow_bulk=self._allow_bulk)
+                                               allow_bulk=self._allow_bulk,
+                                               plan=self._create_plan)
         action = self._plugin_handlers[self.CREATE]
         # Check authz
         if self._collection in body:
@@ -411,7 +500,8 @@ class Controller(object):
                             payload)
         body = Controller.prepare_request_body(request.context, body, False,
                                                self._resource, self._attr_info,
-                                               allow_bulk=self._allow_bulk)
+                                               allow_bulk=self._allow_bulk,
+                                               plan=self._update_plan)
         action = self._plugin_handlers[self.UPDATE]
         # Load object to check authz
         # but pass only attributes in the original body and required
@@ -455,7 +545,7 @@ class Controller(object):
 
     @staticmethod
     def prepare_request_body(context, body, is_create, resource, attr_info,
-                             allow_bulk=False):
+                             allow_bulk=False, plan=None):
         """Verifies required attributes are in request body.
 
         Also checking that an attribute is only specified if it is allowed
@@ -464,82 +554,115 @@ class Controller(object):
         Attribute with default values are considered to be optional.
 
         body argument must be the deserialized body.
+
+        :param plan: the ValidationPlan of attr_info for the operation,
+                     compiled from attr_info when not given.
         """
         collection = resource + "s"
         if not body:
             raise webob.exc.HTTPBadRequest(_("Resource body required"))
 
         LOG.debug(_("Request body: %(body)s"), {'body': body})
-        prep_req_body = lambda x: Controller.prepare_request_body(
-            context,
-            x if resource in x else {resource: x},
-            is_create,
-            resource,
-            attr_info,
-            allow_bulk)
+        if plan is None:
+            plan = ValidationPlan(attr_info, is_create)
         if collection in body:
             if not allow_bulk:
                 raise webob.exc.HTTPBadRequest(_("Bulk operation "
                                                  "not supported"))
-            bulk_body = [prep_req_body(item) for item in body[collection]]
+            bulk_body = []
+            for item in body[collection]:
+                if resource not in item:
+                    item = {resource: item}
+                Controller._prepare_resource(context, item.get(resource),
+                                             resource, plan)
+                bulk_body.append(item)
             if not bulk_body:
                 raise webob.exc.HTTPBadRequest(_("Resources required"))
             return {collection: bulk_body}
 
-        res_dict = body.get(resource)
+        Controller._prepare_resource(context, body.get(resource), resource,
+                                     plan)
+        return body
+
+    @staticmethod
+    def _prepare_resource(context, res_dict, resource, plan):
         if res_dict is None:
             msg = _("Unable to find '%s' in request body") % resource
             raise webob.exc.HTTPBadRequest(msg)
+        Controller._populate_tenant_id(context, res_dict, plan.is_create)
+        plan.apply(res_dict)
+
+
+class ValidationPlan(object):
+    """Checks and conversions of an attribute map for create or update.
+
+    The attribute map is walked once, when the plan is built, into flat
+    lists of the checks to run; validators are resolved at that time
+    too. Checks run in the order of the attribute map, so the first
+    error reported is the same as when walking the map.
+    """
+
+    def __init__(self, attr_info, is_create):
+        self.is_create = is_create
+        self.known = frozenset(attr_info)
+        # create: (attr, allow_post, required, default)
+        self.create_checks = []
+        # update: attributes not allowed in PUT
+        self.read_only = []
+        # (attr, convert_to, [(validator, validator data)])
+        self.conversions = []
+        for attr, attr_vals in attr_info.iteritems():
+            if is_create:
+                self.create_checks.append((attr, attr_vals['allow_post'],
+                                           'default' not in attr_vals,
+                                           attr_vals.get('default')))
+            elif not attr_vals['allow_put']:
+                self.read_only.append(attr)
+            validators = [(attributes.validators[rule], data)
+                          for rule, data in
+                          attr_vals.get('validate', {}).iteritems()]
+            if 'convert_to' in attr_vals or validators:
+                self.conversions.append((attr, attr_vals.get('convert_to'),
+                                         validators))
+
+    def apply(self, res_dict):
+        """Validates res_dict, filling defaults and converting values."""
+        extra_keys = set(res_dict) - self.known
+        if extra_keys:
+            msg = _("Unrecognized attribute(s) '%s'") % ', '.join(extra_keys)
+            raise webob.exc.HTTPBadRequest(msg)
 
-        Controller._populate_tenant_id(context, res_dict, is_create)
-        Controller._verify_attributes(res_dict, attr_info)
-
-        if is_create:  # POST
-            for attr, attr_vals in attr_info.iteritems():
-                if attr_vals['allow_post']:
-                    if ('default' not in attr_vals and
-                        attr not in res_dict):
-                        msg = _("Failed to parse request. Required "
-                                "attribute '%s' not specified") % attr
-                        raise webob.exc.HTTPBadRequest(msg)
-                    res_dict[attr] = res_dict.get(attr,
-                                                  attr_vals.get('default'))
-                else:
-                    if attr in res_dict:
-                        msg = _("Attribute '%s' not allowed in POST") % attr
-                        raise webob.exc.HTTPBadRequest(msg)
-        else:  # PUT
-            for attr, attr_vals in attr_info.iteritems():
-                if attr in res_dict and not attr_vals['allow_put']:
-                    msg = _("Cannot update read-only attribute %s") % attr
+        for attr, allowed, required, default in self.create_checks:
+            if allowed:
+                if required and attr not in res_dict:
+                    msg = _("Failed to parse request. Required "
+                            "attribute '%s' not specified") % attr
                     raise webob.exc.HTTPBadRequest(msg)
+                res_dict[attr] = res_dict.get(attr, default)
+            elif attr in res_dict:
+                msg = _("Attribute '%s' not allowed in POST") % attr
+                raise webob.exc.HTTPBadRequest(msg)
+        for attr in self.read_only:
+            if attr in res_dict:
+                msg = _("Cannot update read-only attribute %s") % attr
+                raise webob.exc.HTTPBadRequest(msg)
 
-        for attr, attr_vals in attr_info.iteritems():
-            if (attr not in res_dict or
-                res_dict[attr] is attributes.ATTR_NOT_SPECIFIED):
+        for attr, convert_to, validators in self.conversions:
+            value = res_dict.get(attr, attributes.ATTR_NOT_SPECIFIED)
+            if value is attributes.ATTR_NOT_SPECIFIED:
                 continue
             # Convert values if necessary
-            if 'convert_to' in attr_vals:
-                res_dict[attr] = attr_vals['convert_to'](res_dict[attr])
+            if convert_to:
+                value = res_dict[attr] = convert_to(value)
             # Check that configured values are correct
-            if 'validate' not in attr_vals:
-                continue
-            for rule in attr_vals['validate']:
-                res = attributes.validators[rule](res_dict[attr],
-                                                  attr_vals['validate'][rule])
+            for validator, data in validators:
+                res = validator(value, data)
                 if res:
                     msg_dict = dict(attr=attr, reason=res)
                     msg = _("Invalid input for %(attr)s. "
                             "Reason: %(reason)s.") % msg_dict
                     raise webob.exc.HTTPBadRequest(msg)
-        return body
 
-    @staticmethod
-    def _verify_attributes(res_dict, attr_info):
-        extra_keys = set(res_dict.keys()) - set(attr_info.keys())
-        if extra_keys:
-            msg = _("Unrecognized attribute(s) '%s'") % ', '.join(extra_keys)
-            raise webob.exc.HTTPBadRequest(msg)
 
 def create_resource(collection, resource, plugin, params, allow_bulk=False,
                     member_actions=None, parent=None, allow_pagination=False,
@@ -18,6 +18,7 @@ Utility methods for working with WSGI servers redux
 """
 
 import sys
+import types
 
 import netaddr
 import six
@@ -25,7 +26,9 @@ import webob.dec
 import webob.exc
 
 from vnfsvc.api.v2 import attributes
+from vnfsvc.api.v2 import response_cache
 from vnfsvc.common import exceptions
+from vnfsvc.db import instrumentation as db_instrumentation
 from vnfsvc.openstack.common import gettextutils
 from vnfsvc.openstack.common import log as logging
 from vnfsvc import wsgi
@@ -84,7 +87,24 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
 
             method = getattr(controller, action)
 
-            result = method(request=request, **args)
+            scope = 'API %s.%s' % (getattr(controller, '_collection', ''),
+                                   action)
+            etag = None
+            body = None
+            with db_instrumentation.scope(scope):
+                if (action in ('index', 'show') and
+                        hasattr(controller, 'get_etag')):
+                    etag = controller.get_etag(request, action, **args)
+                if etag and etag in request.if_none_match:
+                    response = webob.Response(request=request, status=304,
+                                              content_type='')
+                    response.etag = etag
+                    return response
+                if etag and action == 'show':
+                    body = response_cache.lookup(args['id'],
+                                                 (etag, content_type))
+                if body is None:
+                    result = method(request=request, **args)
         except (exceptions.VNFSvcException,
                 netaddr.AddrFormatError) as e:
             for fault in faults:
@@ -102,6 +122,9 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
             body = serializer.serialize(
                 {'VnfsvcError': get_exception_data(e)})
             kwargs = {'body': body, 'content_type': content_type}
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after:
+                kwargs['headers'] = {'Retry-After': str(retry_after)}
             raise mapped_exc(**kwargs)
         except webob.exc.HTTPException as e:
             type_, value, tb = sys.exc_info()
@@ -137,15 +160,34 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
             raise webob.exc.HTTPInternalServerError(**kwargs)
 
         status = action_status.get(action, 200)
-        body = serializer.serialize(result)
+        if (body is None and action == 'index' and
+                isinstance(serializer, wsgi.JSONDictSerializer)):
+            # Collections are encoded while they are sent to the client
+            response = webob.Response(
+                request=request, status=status, content_type=content_type,
+                app_iter=serializer.serialize_iter(result))
+            response.etag = etag
+            return response
+        if body is None:
+            if action == 'index':
+                # Only JSON is encoded from the streamed rows
+                result = dict((key, list(value)
+                               if isinstance(value, types.GeneratorType)
+                               else value)
+                              for key, value in result.iteritems())
+            body = serializer.serialize(result)
+            if etag and action == 'show':
+                response_cache.store(args['id'], (etag, content_type), body)
         # NOTE(jkoelker) Comply with RFC2616 section 9.7
         if status == 204:
             content_type = ''
             body = None
 
-        return webob.Response(request=request, status=status,
-                              content_type=content_type,
-                              body=body)
+        response = webob.Response(request=request, status=status,
+                                  content_type=content_type,
+                                  body=body)
+        response.etag = etag
+        return response
     return resource
 
 
@@ -49,7 +49,7 @@ def build_resource_info(plural_mappings, resource_map, which_service,
         which_service = constants.CORE
     if action_map is None:
         action_map = {}
-    plugin = manager.VnfsvcManager.get_plugin()
+    plugin = manager.VNFSvcManager.get_plugin()
     for collection_name in resource_map:
         resource_name = plural_mappings[collection_name]
         params = resource_map.get(collection_name, {})
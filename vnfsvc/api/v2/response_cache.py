@@ -0,0 +1,62 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process cache of serialized API resource responses.
+
+Holds the last serialized body of each resource, keyed by resource id and
+validated by the ETag (and content type) of the request. Entries are
+dropped when the database row of the resource is written to, see
+invalidate().
+"""
+
+import collections
+
+from oslo.config import cfg
+
+from vnfsvc.openstack.common.gettextutils import _
+
+cache_opts = [
+    cfg.IntOpt('api_response_cache_size', default=1000,
+               help=_("Number of serialized resources kept to answer "
+                      "repeated GET requests, 0 disables the cache")),
+]
+cfg.CONF.register_opts(cache_opts)
+
+_entries = collections.OrderedDict()
+
+
+def lookup(id, key):
+    """Returns the body cached for id if it was stored under key."""
+    entry = _entries.pop(id, None)
+    if entry is None:
+        return None
+    _entries[id] = entry
+    if entry[0] != key:
+        return None
+    return entry[1]
+
+
+def store(id, key, body):
+    size = cfg.CONF.api_response_cache_size
+    if size <= 0:
+        return
+    _entries.pop(id, None)
+    _entries[id] = (key, body)
+    while len(_entries) > size:
+        _entries.popitem(last=False)
+
+
+def invalidate(id):
+    _entries.pop(id, None)
@@ -32,10 +32,15 @@ LOG = logging.getLogger(__name__)
 RESOURCES = {'vnf': 'vnfs',
              'vnf_template': 'vnf_templates',
              'connection': 'connections',
-             'service': 'services'}
+             'service': 'services',
+             'service_event': 'service_events',
+             'service_phase_stat': 'service_phase_stats'}
 SUB_RESOURCES = {}
 COLLECTION_ACTIONS = ['index', 'create']
 MEMBER_ACTIONS = ['show', 'update', 'delete']
+# Collection and member actions of the read-only resources
+READ_ONLY_ACTIONS = {'service_events': (['index'], ['show']),
+                     'service_phase_stats': (['index'], [])}
 REQUIREMENTS = {'id': attributes.UUID_PATTERN, 'format': 'xml|json'}
 
 
@@ -74,9 +79,6 @@ class APIRouter(wsgi.Router):
         mapper = routes_mapper.Mapper()
         plugin = manager.VNFSvcManager.get_plugin()
 
-        col_kwargs = dict(collection_actions=COLLECTION_ACTIONS,
-                          member_actions=MEMBER_ACTIONS)
-
         def _map_resource(collection, resource, params, parent=None):
             allow_bulk = cfg.CONF.allow_bulk
             allow_pagination = cfg.CONF.allow_pagination
@@ -90,10 +92,13 @@ class APIRouter(wsgi.Router):
                 path_prefix = "/%s/{%s_id}/%s" % (parent['collection_name'],
                                                   parent['member_name'],
                                                   collection)
+            collection_actions, member_actions = READ_ONLY_ACTIONS.get(
+                collection, (COLLECTION_ACTIONS, MEMBER_ACTIONS))
             mapper_kwargs = dict(controller=controller,
                                  requirements=REQUIREMENTS,
                                  path_prefix=path_prefix,
-                                 **col_kwargs)
+                                 collection_actions=collection_actions,
+                                 member_actions=member_actions)
             return mapper.collection(collection, resource,
                                      **mapper_kwargs)
 
@@ -264,6 +264,13 @@ RESOURCE_ATTRIBUTE_MAP = {
     },
 
     'services': {
+         'id': {
+             'allow_post': False,
+             'allow_put': False,
+             'validate': {'type:uuid': None},
+             'is_visible': True,
+             'primary_key': True,
+         },
          'tenant_id': {
              'allow_post': True,
              'allow_put': False,
@@ -299,6 +306,100 @@ RESOURCE_ATTRIBUTE_MAP = {
             'is_visible': True,
             'default': {},
          },
+         'service_type': {
+             'allow_post': False,
+             'allow_put': False,
+             'is_visible': True,
+         },
+         'status': {
+             'allow_post': False,
+             'allow_put': False,
+             'is_visible': True,
+         },
+         'revision': {
+             'allow_post': False,
+             'allow_put': False,
+             'is_visible': True,
+         },
+    },
+
+    'service_events': {
+        'id': {
+            'allow_post': False,
+            'allow_put': False,
+            'validate': {'type:uuid': None},
+            'is_visible': True,
+            'primary_key': True,
+        },
+        'tenant_id': {
+            'allow_post': False,
+            'allow_put': False,
+            'required_by_policy': True,
+            'is_visible': True,
+        },
+        'service_id': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'phase': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'vdu': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'started_at': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'duration': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'created_at': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+    },
+
+    'service_phase_stats': {
+        'phase': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'count': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'p50': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'p90': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'p99': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
+        'max': {
+            'allow_post': False,
+            'allow_put': False,
+            'is_visible': True,
+        },
     },
 
 }
@@ -0,0 +1,148 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Admission control of concurrent service deployments.
+
+A deployment may start when both the global and the tenant limit of
+running deployments allow it. Otherwise it waits in a bounded FIFO queue,
+a request arriving with the queue full is rejected at once.
+"""
+
+import collections
+
+from eventlet import queue
+from oslo.config import cfg
+
+from vnfsvc.common import exceptions
+from vnfsvc.openstack.common.gettextutils import _
+from vnfsvc.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+admission_opts = [
+    cfg.IntOpt('max_concurrent_deployments', default=4,
+               help=_("Number of service deployments running at once, "
+                      "0 for no limit")),
+    cfg.IntOpt('max_tenant_deployments', default=2,
+               help=_("Number of service deployments of a tenant running "
+                      "at once, 0 for no limit")),
+    cfg.IntOpt('deployment_queue_size', default=20,
+               help=_("Number of service deployments waiting to start, "
+                      "further requests are rejected with 429")),
+    cfg.IntOpt('deployment_retry_after', default=30,
+               help=_("Seconds advertised in the Retry-After header of "
+                      "rejected deployment requests")),
+]
+cfg.CONF.register_opts(admission_opts, 'vnf')
+
+_ADMITTED = object()
+
+
+class _Waiter(object):
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+        self.position = None
+        self.messages = queue.LightQueue()
+
+
+class AdmissionController(object):
+    """Limits the deployments running at once, globally and per tenant."""
+
+    def __init__(self, max_running, max_tenant_running, max_queued,
+                 retry_after):
+        self.max_running = max_running
+        self.max_tenant_running = max_tenant_running
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self._running = 0
+        self._tenant_running = collections.defaultdict(int)
+        self._queue = collections.deque()
+
+    @classmethod
+    def from_config(cls, conf=None):
+        conf = (conf or cfg.CONF).vnf
+        return cls(conf.max_concurrent_deployments,
+                   conf.max_tenant_deployments,
+                   conf.deployment_queue_size,
+                   conf.deployment_retry_after)
+
+    def _can_start(self, tenant_id):
+        if self.max_running and self._running >= self.max_running:
+            return False
+        return not (self.max_tenant_running and
+                    self._tenant_running[tenant_id] >=
+                    self.max_tenant_running)
+
+    def _start(self, tenant_id):
+        self._running += 1
+        self._tenant_running[tenant_id] += 1
+
+    def admit(self, tenant_id, queued_callback=None):
+        """Waits until a deployment of tenant_id may start.
+
+        :param queued_callback: called with the 1-based queue position
+                                while the deployment waits, each time the
+                                position changes.
+        :raises: OverLimit when the queue is full.
+        """
+        # Waiters which could start have been admitted on release, so a
+        # request which may start does not overtake any of them.
+        if self._can_start(tenant_id):
+            self._start(tenant_id)
+            return
+        if len(self._queue) >= self.max_queued:
+            raise exceptions.OverLimit(resource='deployment',
+                                       retry_after=self.retry_after)
+        waiter = _Waiter(tenant_id)
+        self._queue.append(waiter)
+        self._notify_positions()
+        admitted = False
+        try:
+            while True:
+                message = waiter.messages.get()
+                if message is _ADMITTED:
+                    admitted = True
+                    return
+                if queued_callback:
+                    queued_callback(message)
+        finally:
+            if not admitted:
+                if waiter in self._queue:
+                    self._queue.remove(waiter)
+                    self._notify_positions()
+                elif waiter.position is _ADMITTED:
+                    # Admitted while the callback was running
+                    self.release(tenant_id)
+
+    def release(self, tenant_id):
+        """Ends a deployment admitted by admit()."""
+        self._running -= 1
+        self._tenant_running[tenant_id] -= 1
+        if not self._tenant_running[tenant_id]:
+            del self._tenant_running[tenant_id]
+        for waiter in list(self._queue):
+            if self._can_start(waiter.tenant_id):
+                self._queue.remove(waiter)
+                self._start(waiter.tenant_id)
+                waiter.position = _ADMITTED
+                waiter.messages.put(_ADMITTED)
+        self._notify_positions()
+
+    def _notify_positions(self):
+        for position, waiter in enumerate(self._queue, 1):
+            if waiter.position != position:
+                waiter.position = position
+                waiter.messages.put(position)
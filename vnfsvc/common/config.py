@@ -38,6 +38,10 @@ core_opts = [
                help=_("The host IP to bind to")),
     cfg.IntOpt('bind_port', default=9010,
                help=_("The port to bind to")),
+    cfg.IntOpt('api_workers', default=0,
+               help=_("Number of separate API worker processes sharing "
+                      "the listening socket. 0 serves the API from the "
+                      "main process")),
     cfg.StrOpt('api_paste_config', default="api-paste.ini",
                help=_("The API paste config file to use")),
     cfg.StrOpt('api_extensions_path', default="",
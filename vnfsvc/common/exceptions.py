@@ -80,6 +80,15 @@ class InUse(VNFSvcException):
     message = _("The resource is inuse")
 
 
+class OverLimit(VNFSvcException):
+    message = _("Too many %(resource)s requests in progress, retry after "
+                "%(retry_after)d seconds")
+
+    def __init__(self, **kwargs):
+        super(OverLimit, self).__init__(**kwargs)
+        self.retry_after = kwargs.get('retry_after')
+
+
 
 class ResourceExhausted(ServiceUnavailable):
     pass
@@ -127,4 +136,10 @@ class InstanceException(VNFSvcException):
 class DriverException(VNFSvcException):
     message = _("Driver Exception occured.")
 
+class ConfigurationError(VNFSvcException):
+    message = _("Configuration of VNF failed.")
+
+class VNFManagerNotReady(VNFSvcException):
+    message = _("VNF manager %(vnfm_id)s did not get ready.")
+
 
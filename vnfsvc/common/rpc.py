@@ -14,6 +14,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
+import collections
+import zlib
+
+from eventlet import semaphore
 from oslo.config import cfg
 from oslo import messaging
 from oslo.messaging.rpc import dispatcher as rpc_dispatcher
@@ -22,13 +27,31 @@ from oslo.messaging import server as msg_server
 
 from vnfsvc.common import exceptions
 from vnfsvc.common import log
+from vnfsvc.common import rpc_instrumentation
+from vnfsvc.common import topics
 from vnfsvc import context
+from vnfsvc.db import instrumentation as db_instrumentation
+from vnfsvc.openstack.common.gettextutils import _
+from vnfsvc.openstack.common import jsonutils
 from vnfsvc.openstack.common import log as logging
 from vnfsvc.openstack.common import service
 
 
 LOG = logging.getLogger(__name__)
 
+rpc_opts = [
+    cfg.IntOpt('rpc_compress_min_size', default=0,
+               help=_("VNF manager configurations whose JSON encoding is at "
+                      "least this many bytes are sent zlib compressed, 0 to "
+                      "disable. The VNF managers must support it")),
+]
+cfg.CONF.register_opts(rpc_opts)
+
+# Key of the RPC message arguments sent compressed
+COMPRESSED_KEY = '__zlib__'
+# Topics of the messages whose context is stamped with the send time
+STAMPED_TOPICS = frozenset([topics.PLUGIN, topics.PLUGIN_CONTROL])
+
 
 TRANSPORT = None
 NOTIFIER = None
@@ -51,10 +74,10 @@ TRANSPORT_ALIASES = {
 }
 
 
-def init(conf):
+def init(conf, url=None):
     global TRANSPORT, NOTIFIER
     exmods = get_allowed_exmods()
-    TRANSPORT = messaging.get_transport(conf,
+    TRANSPORT = messaging.get_transport(conf, url=url,
                                         allowed_remote_exmods=exmods,
                                         aliases=TRANSPORT_ALIASES)
     serializer = RequestContextSerializer()
@@ -81,19 +104,38 @@ def get_allowed_exmods():
     return ALLOWED_EXMODS + EXTRA_EXMODS
 
 
+def compress(entity):
+    """Returns entity zlib compressed if its JSON encoding is large enough.
+
+    The entity is encoded once, the compressed form wraps that encoding.
+    Only for arguments whose consumers decompress them, see
+    rpc_compress_min_size.
+    """
+    min_size = cfg.CONF.rpc_compress_min_size
+    if min_size <= 0:
+        return entity
+    data = jsonutils.dumps(entity)
+    if len(data) < min_size:
+        return entity
+    return {COMPRESSED_KEY: base64.b64encode(zlib.compress(data))}
+
+
 def get_client(target, version_cap=None, serializer=None):
     assert TRANSPORT is not None
-    serializer = RequestContextSerializer(serializer)
+    # Only the messages between vnfsvc processes carry the send time, the
+    # VNF managers do not expect it in the context
+    serializer = RequestContextSerializer(
+        serializer, stamp=target.topic in STAMPED_TOPICS)
     return messaging.RPCClient(TRANSPORT,
                                target,
                                version_cap=version_cap,
                                serializer=serializer)
 
 
-def get_server(target, endpoints, serializer=None):
+def get_server(target, endpoints, serializer=None, workers=0):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
-    dispatcher = RPCDispatcher(target, endpoints, serializer)
+    dispatcher = RPCDispatcher(target, endpoints, serializer, workers=workers)
     return msg_server.MessageHandlingServer(TRANSPORT, dispatcher, 'eventlet')
 
 
@@ -104,23 +146,59 @@ def get_notifier(service=None, host=None, publisher_id=None):
     return NOTIFIER.prepare(publisher_id=publisher_id)
 
 
+class _SanitizedContext(object):
+    """Formats an RPC context without its secrets, only once logged."""
+
+    sanitize_key_list = ('auth_token', )
+
+    def __init__(self, ctxt):
+        self._ctxt = ctxt
+
+    def __str__(self):
+        return str(dict((k, '***' if k in self.sanitize_key_list else v)
+                        for (k, v) in self._ctxt.items()))
+
+
 class RPCDispatcher(rpc_dispatcher.RPCDispatcher):
+    """Dispatches incoming messages to the endpoints.
+
+    :param workers: maximum number of messages handled at once, further
+                    messages wait for a worker. 0 leaves the concurrency
+                    to the executor (rpc_thread_pool_size).
+    """
+
+    def __init__(self, target, endpoints, serializer, workers=0):
+        super(RPCDispatcher, self).__init__(target, endpoints, serializer)
+        self._workers = semaphore.Semaphore(workers) if workers > 0 else None
+
     def __call__(self, incoming):
-        sanitize_key_list = ('auth_token', )
-        sanitized_ctxt = dict((k, '***' if k in sanitize_key_list else v)
-                              for (k, v) in incoming.ctxt.items())
-        LOG.debug('Incoming RPC: ctxt:%s message:%s', sanitized_ctxt,
-                  incoming.message)
+        LOG.debug('Incoming RPC: ctxt:%s message:%s',
+                  _SanitizedContext(incoming.ctxt), incoming.message)
         return super(RPCDispatcher, self).__call__(incoming)
 
+    def _dispatch(self, ctxt, message, *args, **kwargs):
+        if self._workers is None:
+            return self._dispatch_measured(ctxt, message, *args, **kwargs)
+        # NOTE: the wait for a worker is part of the measured queue delay
+        with self._workers:
+            return self._dispatch_measured(ctxt, message, *args, **kwargs)
+
+    def _dispatch_measured(self, ctxt, message, *args, **kwargs):
+        scope = 'RPC %s' % message.get('method')
+        with db_instrumentation.scope(scope):
+            with rpc_instrumentation.dispatched(ctxt, message):
+                return super(RPCDispatcher, self)._dispatch(ctxt, message,
+                                                            *args, **kwargs)
+
 
 class RequestContextSerializer(om_serializer.Serializer):
     """This serializer is used to convert RPC common context into
     Vnfsvc Context.
     """
-    def __init__(self, base=None):
+    def __init__(self, base=None, stamp=False):
         super(RequestContextSerializer, self).__init__()
         self._base = base
+        self._stamp = stamp
 
     def serialize_entity(self, ctxt, entity):
         if not self._base:
@@ -133,10 +211,13 @@ class RequestContextSerializer(om_serializer.Serializer):
         return self._base.deserialize_entity(ctxt, entity)
 
     def serialize_context(self, ctxt):
+        if self._stamp:
+            return rpc_instrumentation.stamp(ctxt.to_dict())
         return ctxt.to_dict()
 
     def deserialize_context(self, ctxt):
         rpc_ctxt_dict = ctxt.copy()
+        rpc_ctxt_dict.pop(rpc_instrumentation.SENT_AT, None)
         user_id = rpc_ctxt_dict.pop('user_id', None)
         if not user_id:
             user_id = rpc_ctxt_dict.pop('user', None)
@@ -161,6 +242,19 @@ class RpcProxy(object):
         self.topic = topic
         target = messaging.Target(topic=topic, version=default_version)
         self._client = get_client(target, version_cap=version_cap)
+        # Prepared clients, by the options of the calls
+        self._prepared = {}
+
+    def close(self):
+        """Releases the RPC client, the proxy is not usable afterwards.
+
+        The shared TRANSPORT and its reply queue stay open for the other
+        clients, a transport of the client's own is cleaned up.
+        """
+        client, self._client = self._client, None
+        self._prepared.clear()
+        if client is not None and client.transport is not TRANSPORT:
+            client.transport.cleanup()
 
     def make_msg(self, method, **kwargs):
         return {'method': method,
@@ -191,12 +285,55 @@ class RpcProxy(object):
             options['namespace'] = msg['namespace']
 
         if options:
-            callee = self._client.prepare(**options)
+            key = tuple(sorted(options.iteritems()))
+            callee = self._prepared.get(key)
+            if callee is None:
+                callee = self._prepared[key] = self._client.prepare(
+                    **options)
         else:
             callee = self._client
 
         func = getattr(callee, kwargs['rpc_method'])
-        return func(context, msg['method'], **msg['args'])
+        kind = 'fanout_cast' if options.get('fanout') else kwargs['rpc_method']
+        with rpc_instrumentation.sent(kind, msg['method'], msg['args']):
+            return func(context, msg['method'], **msg['args'])
+
+
+class ClientPool(object):
+    """Bounded pool of RPC proxies keyed by topic.
+
+    Proxies are created on first use by factory(topic). When the pool is
+    full the least recently used proxy is closed and dropped, it is
+    created again if its topic is used later.
+    """
+
+    def __init__(self, size, factory):
+        self.size = size
+        self._factory = factory
+        self._clients = collections.OrderedDict()
+
+    def get(self, topic):
+        client = self._clients.pop(topic, None)
+        if client is None:
+            client = self._factory(topic)
+        self._clients[topic] = client
+        while len(self._clients) > self.size:
+            evicted, evicted_client = self._clients.popitem(last=False)
+            evicted_client.close()
+            LOG.debug("Evicted RPC client of topic %s", evicted)
+        return client
+
+    def remove(self, topic):
+        """Closes the proxy of topic, e.g. once its consumer is gone."""
+        client = self._clients.pop(topic, None)
+        if client is not None:
+            client.close()
+
+    def __contains__(self, topic):
+        return topic in self._clients
+
+    def __len__(self):
+        return len(self._clients)
 
 
 class RpcCallback(object):
@@ -269,10 +406,10 @@ class Connection(object):
         super(Connection, self).__init__()
         self.servers = []
 
-    def create_consumer(self, topic, endpoints, fanout=False):
+    def create_consumer(self, topic, endpoints, fanout=False, workers=0):
         target = messaging.Target(
             topic=topic, server=cfg.CONF.host, fanout=fanout)
-        server = get_server(target, endpoints)
+        server = get_server(target, endpoints, workers=workers)
         self.servers.append(server)
 
     def consume_in_threads(self):
@@ -0,0 +1,127 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Call, cast and dispatch statistics of the RPC layer.
+
+RpcProxy records the messages it sends with sent(), RPCDispatcher the
+messages it handles with dispatched(). Statistics are kept per process,
+by kind ('call', 'cast', 'fanout_cast' or 'dispatch') and method, and are
+exposed with the API metrics.
+
+The queue delay of a dispatched message is measured from the time stamped
+in its context by the sender, it includes clock differences between
+hosts.
+"""
+
+import collections
+import contextlib
+import itertools
+import time
+
+from oslo.config import cfg
+
+from vnfsvc.common import histogram
+from vnfsvc.common import utils
+from vnfsvc.openstack.common.gettextutils import _
+from vnfsvc.openstack.common import jsonutils
+
+instrumentation_opts = [
+    cfg.BoolOpt('rpc_instrumentation', default=True,
+                help=_("Count and time RPC calls, casts and dispatched "
+                       "messages")),
+    cfg.IntOpt('rpc_payload_sample_rate', default=10,
+               help=_("Measure the payload size of one in this many RPC "
+                      "messages, 0 to disable")),
+]
+cfg.CONF.register_opts(instrumentation_opts)
+
+# Context key of the time a message was sent, in seconds since the epoch
+SENT_AT = 'rpc_sent_at'
+
+DISPATCH = 'dispatch'
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.messages = collections.defaultdict(int)
+        self.errors = collections.defaultdict(int)
+        self.duration = collections.defaultdict(
+            lambda: histogram.Histogram(histogram.LATENCY_BUCKETS))
+        self.queue_delay = collections.defaultdict(
+            lambda: histogram.Histogram(histogram.LATENCY_BUCKETS))
+        self.size = collections.defaultdict(
+            lambda: histogram.Histogram(histogram.SIZE_BUCKETS))
+
+
+STATS = Stats()
+
+_sequence = itertools.count()
+
+
+def stamp(ctxt_dict):
+    """Stores the send time in a serialized context."""
+    if cfg.CONF.rpc_instrumentation:
+        ctxt_dict[SENT_AT] = time.time()
+    return ctxt_dict
+
+
+def _observe_size(key, payload):
+    rate = cfg.CONF.rpc_payload_sample_rate
+    if rate > 0 and next(_sequence) % rate == 0:
+        STATS.size[key].observe(len(jsonutils.dumps(payload)))
+
+
+@contextlib.contextmanager
+def _measure(key):
+    started_at = utils.monotonic()
+    STATS.messages[key] += 1
+    try:
+        yield
+    except Exception:
+        STATS.errors[key] += 1
+        raise
+    finally:
+        STATS.duration[key].observe(utils.monotonic() - started_at)
+
+
+@contextlib.contextmanager
+def sent(kind, method, args):
+    """Records the call or cast of method made in the block.
+
+    The duration of a cast is the time taken to send it.
+    """
+    if not cfg.CONF.rpc_instrumentation:
+        yield
+        return
+    key = (kind, method)
+    _observe_size(key, args)
+    with _measure(key):
+        yield
+
+
+@contextlib.contextmanager
+def dispatched(ctxt, message):
+    """Records the handling of the incoming message run in the block."""
+    if not cfg.CONF.rpc_instrumentation:
+        yield
+        return
+    key = (DISPATCH, message.get('method'))
+    sent_at = ctxt.get(SENT_AT)
+    if sent_at:
+        STATS.queue_delay[key].observe(max(0.0, time.time() - sent_at))
+    _observe_size(key, message.get('args', {}))
+    with _measure(key):
+        yield
@@ -16,6 +16,9 @@
 
 
 PLUGIN = 'v-plugin'
+# Acknowledgements and other latency sensitive messages to the plugin, kept
+# apart from the traffic of PLUGIN so that they are not queued behind it
+PLUGIN_CONTROL = 'v-plugin-control'
 VNF_MANAGER = 'v-manager'
 
 def set_topic_name(uuid, prefix=None, host=None):
@@ -18,6 +18,8 @@
 
 """Utilities and helper functions."""
 
+import ctypes
+import ctypes.util
 import datetime
 import functools
 import hashlib
@@ -27,6 +29,7 @@ import os
 import random
 import signal
 import socket
+import time
 import uuid
 import tempfile
 
@@ -49,6 +52,51 @@ def get_hostname():
     return socket.gethostname()
 
 
+class _timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+_CLOCK_MONOTONIC = 1
+
+
+def _load_clock_gettime():
+    # clock_gettime is in libc since glibc 2.17, in librt before
+    for name in ('c', 'rt'):
+        path = ctypes.util.find_library(name)
+        if not path:
+            continue
+        try:
+            clock_gettime = ctypes.CDLL(path, use_errno=True).clock_gettime
+        except (OSError, AttributeError):
+            continue
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+        clock_gettime.restype = ctypes.c_int
+        return clock_gettime
+
+
+_clock_gettime = (None if hasattr(time, 'monotonic')
+                  else _load_clock_gettime())
+
+
+def monotonic():
+    """Seconds from an arbitrary fixed point, unaffected by clock changes.
+
+    Python 2 has no time.monotonic, CLOCK_MONOTONIC is read through
+    clock_gettime instead. Where it is unavailable the wall clock is
+    used, which has the resolution needed to time short intervals but
+    follows clock changes.
+    """
+    if _clock_gettime is None:
+        if hasattr(time, 'monotonic'):
+            return time.monotonic()
+        return time.time()
+    ts = _timespec()
+    if _clock_gettime(_CLOCK_MONOTONIC, ctypes.byref(ts)) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
 def log_opt_values(log):
     cfg.CONF.log_opt_values(log, std_logging.DEBUG)
 
@@ -0,0 +1,91 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Pool of idle VNF managers started ahead of the services using them.
+
+An idle VNF manager is started with a standby id and is ready once it
+consumes the topic of that id. A service claims one and hands it its own
+id and configuration, the pool is then refilled in the background.
+"""
+
+import collections
+import uuid
+
+import eventlet
+
+from vnfsvc.openstack.common.gettextutils import _
+from vnfsvc.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class VNFManagerPool(object):
+    """Idle VNF managers, by standby id.
+
+    :param size: number of idle VNF managers to keep
+    :param start: start(standby_id) starts a VNF manager with the standby
+                  id and returns once it is ready, raising otherwise
+    :param stop: stop(standby_id) stops the VNF manager with the standby id
+    """
+
+    def __init__(self, size, start, stop):
+        self.size = size
+        self._start = start
+        self._stop = stop
+        self._idle = collections.deque()
+        self._refilling = False
+        self._closed = False
+
+    def claim(self):
+        """Returns the standby id of an idle VNF manager, None if none is."""
+        standby_id = self._idle.popleft() if self._idle else None
+        self.refill()
+        return standby_id
+
+    def refill(self):
+        """Starts VNF managers in the background up to the pool size."""
+        if (not self._closed and not self._refilling and
+                len(self._idle) < self.size):
+            self._refilling = True
+            eventlet.spawn_n(self._refill)
+
+    def _refill(self):
+        try:
+            while not self._closed and len(self._idle) < self.size:
+                standby_id = str(uuid.uuid4())
+                self._start(standby_id)
+                if self._closed:
+                    self._stop(standby_id)
+                    break
+                self._idle.append(standby_id)
+                LOG.debug(_("Idle VNF manager %s ready"), standby_id)
+        except Exception:
+            LOG.exception(_("Unable to start an idle VNF manager"))
+        finally:
+            self._refilling = False
+
+    def close(self):
+        """Stops the idle VNF managers, the pool is not refilled anymore."""
+        self._closed = True
+        while self._idle:
+            standby_id = self._idle.popleft()
+            try:
+                self._stop(standby_id)
+            except Exception:
+                LOG.exception(_("Unable to stop idle VNF manager %s"),
+                              standby_id)
+
+    def __len__(self):
+        return len(self._idle)
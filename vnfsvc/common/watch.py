@@ -0,0 +1,67 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process notification of resource changes to parked watchers."""
+
+import collections
+
+import eventlet
+from eventlet import event
+from oslo.config import cfg
+
+from vnfsvc.openstack.common.gettextutils import _
+
+watch_opts = [
+    cfg.IntOpt('watch_timeout_max', default=60,
+               help=_("Maximum seconds a wait_for_change request is held "
+                      "open")),
+    cfg.IntOpt('watch_poll_interval', default=5,
+               help=_("Seconds between database checks of a watched "
+                      "resource, catching changes made by other API "
+                      "workers")),
+]
+cfg.CONF.register_opts(watch_opts)
+
+
+class Notifier(object):
+    """Wakes all the greenthreads waiting on a key when it is notified."""
+
+    def __init__(self):
+        self._events = {}
+        self._waiters = collections.defaultdict(int)
+
+    def wait(self, key, timeout):
+        """Waits until key is notified or timeout seconds pass."""
+        waiter = self._events.get(key)
+        if waiter is None:
+            waiter = self._events[key] = event.Event()
+        self._waiters[key] += 1
+        try:
+            with eventlet.Timeout(timeout, False):
+                waiter.wait()
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if self._events.get(key) is waiter:
+                    del self._events[key]
+
+    def notify(self, key):
+        waiter = self._events.pop(key, None)
+        if waiter is not None:
+            waiter.send()
+
+
+services = Notifier()
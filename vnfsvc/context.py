@@ -20,6 +20,8 @@ import copy
 
 import datetime
 
+from sqlalchemy import event
+
 from vnfsvc.db import api as db_api
 from vnfsvc.openstack.common import context as common_context
 from vnfsvc.openstack.common import local
@@ -64,6 +66,8 @@ class ContextBase(common_context.RequestContext):
             timestamp = datetime.datetime.utcnow()
         self.timestamp = timestamp
         self._session = None
+        self._reader_session = None
+        self._wrote = False
 
     @property
     def project_id(self):
@@ -130,14 +134,45 @@ class ContextBase(common_context.RequestContext):
 
         return context
 
+    def copy_with_new_session(self):
+        """Return a copy of this context with its own DB sessions.
+
+        Sessions must not be shared between greenthreads.
+        """
+        context = copy.copy(self)
+        context._session = None
+        context._reader_session = None
+        context._wrote = False
+        return context
+
 
 class Context(ContextBase):
     @property
     def session(self):
         if self._session is None:
             self._session = db_api.get_session()
+            for name in ('after_flush', 'after_bulk_update',
+                         'after_bulk_delete'):
+                event.listen(self._session, name, self._record_write)
         return self._session
 
+    def _record_write(self, *args):
+        self._wrote = True
+
+    @property
+    def reader_session(self):
+        """Session for read-only queries, served by the read replica.
+
+        Once the context wrote through its primary session, reads go to
+        the primary too, so that they see those writes. Reads made on the
+        primary session, such as ETag revisions, do not pin the context.
+        """
+        if self._wrote:
+            return self.session
+        if self._reader_session is None:
+            self._reader_session = db_api.get_session(use_slave=True)
+        return self._reader_session
+
 
 def get_admin_context(read_deleted="no", load_admin_roles=True):
     return Context(user_id=None,
@@ -13,10 +13,32 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from oslo.config import cfg
 from oslo.db.sqlalchemy import session
+from sqlalchemy import event
+
+from vnfsvc.db import instrumentation
+from vnfsvc.openstack.common.gettextutils import _
+
+database_opts = [
+    cfg.IntOpt('slave_fallback_window', default=5,
+               help=_("Seconds after a commit on the primary database "
+                      "during which reads are served by the primary instead "
+                      "of slave_connection. Commits are tracked per process, "
+                      "this bounds the replica lag seen by clients of the "
+                      "same API worker only")),
+]
+cfg.CONF.register_opts(database_opts, 'database')
 
 _FACADE = None
+_LAST_WRITE = 0
+
+
+def _record_write(conn):
+    global _LAST_WRITE
+    _LAST_WRITE = time.time()
 
 
 def _create_facade_lazily():
@@ -24,18 +46,60 @@ def _create_facade_lazily():
 
     if _FACADE is None:
         _FACADE = session.EngineFacade.from_config(cfg.CONF, sqlite_fk=True)
+        engine = _FACADE.get_engine()
+        event.listen(engine, 'commit', _record_write)
+        instrumentation.instrument_engine(engine)
+        slave_engine = _FACADE.get_engine(use_slave=True)
+        if slave_engine is not engine:
+            instrumentation.instrument_engine(slave_engine)
 
     return _FACADE
 
 
-def get_engine():
+def dispose():
+    """Closes the pooled connections of the engines, if any were created.
+
+    Called before forking worker processes, so that children do not
+    inherit connections shared with the parent.
+    """
+    if _FACADE is not None:
+        _FACADE.get_engine().pool.dispose()
+        _FACADE.get_engine(use_slave=True).pool.dispose()
+
+
+def reset():
+    """Drops the engine facade, a new one is created on next use.
+
+    Called in forked worker processes.
+    """
+    global _FACADE
+    _FACADE = None
+
+
+def _slave_usable():
+    if not cfg.CONF.database.slave_connection:
+        return False
+    window = cfg.CONF.database.slave_fallback_window
+    return time.time() - _LAST_WRITE >= window
+
+
+def get_engine(use_slave=False):
     """Helper method to grab engine."""
     facade = _create_facade_lazily()
-    return facade.get_engine()
+    return facade.get_engine(use_slave=use_slave and _slave_usable())
+
 
+def get_session(autocommit=True, expire_on_commit=False, use_slave=False):
+    """Helper method to grab session.
 
-def get_session(autocommit=True, expire_on_commit=False):
-    """Helper method to grab session."""
+    :param use_slave: return a session on the read replica configured by
+                      [database] slave_connection, unless this process
+                      wrote to the primary within slave_fallback_window
+                      seconds. Writes of other processes are not seen,
+                      reads following a write of the same request are
+                      pinned to the primary by the context instead.
+    """
     facade = _create_facade_lazily()
     return facade.get_session(autocommit=autocommit,
-                              expire_on_commit=expire_on_commit)
+                              expire_on_commit=expire_on_commit,
+                              use_slave=use_slave and _slave_usable())
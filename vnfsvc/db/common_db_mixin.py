@@ -16,10 +16,15 @@
 
 import weakref
 
+from sqlalchemy import orm
 from sqlalchemy import sql
 
 from vnfsvc.common import exceptions as v_exc
 from vnfsvc.db import sqlalchemyutils
+from vnfsvc.openstack.common.gettextutils import _
+
+# Rows fetched per batch when a collection is streamed
+YIELD_PER = 100
 
 
 class CommonDbMixin(object):
@@ -68,8 +73,11 @@ class CommonDbMixin(object):
         """
         return weakref.proxy(self)
 
-    def _model_query(self, context, model):
-        query = context.session.query(model)
+    def _model_query(self, context, model, read_only=False):
+        if read_only:
+            query = context.reader_session.query(model)
+        else:
+            query = context.session.query(model)
         # define basic filter condition for model query
         # NOTE(jkoelker) non-admin queries are scoped to their tenant_id
         # NOTE(salvatore-orlando): unless the model allows for shared objects
@@ -107,6 +115,20 @@ class CommonDbMixin(object):
                          if key in fields))
         return resource
 
+    def _load_only(self, query, model, fields):
+        """Restricts query to load only the columns of model in fields.
+
+        Other columns are deferred, the dict functions of the resources
+        must then only read the requested fields.
+        """
+        if not fields:
+            return query
+        columns = orm.class_mapper(model).column_attrs.keys()
+        requested = [field for field in set(fields) if field in columns]
+        if not requested:
+            return query
+        return query.options(orm.load_only(*requested))
+
     def _get_tenant_id_for_create(self, context, resource):
         if context.is_admin and 'tenant_id' in resource:
             tenant_id = resource['tenant_id']
@@ -153,8 +175,8 @@ class CommonDbMixin(object):
 
     def _get_collection_query(self, context, model, filters=None,
                               sorts=None, limit=None, marker_obj=None,
-                              page_reverse=False):
-        collection = self._model_query(context, model)
+                              page_reverse=False, read_only=False):
+        collection = self._model_query(context, model, read_only=read_only)
         collection = self._apply_filters_to_query(collection, model, filters)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
@@ -170,14 +192,43 @@ class CommonDbMixin(object):
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
-                                           page_reverse=page_reverse)
+                                           page_reverse=page_reverse,
+                                           read_only=True)
+        query = self._load_only(query, model, fields)
         items = [dict_func(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
 
+    def _iter_collection(self, context, model, dict_func, filters=None,
+                         fields=None, sorts=None, limit=None, marker_obj=None,
+                         page_reverse=False):
+        """Like _get_collection, but yields the dicts as rows are fetched.
+
+        Rows are loaded YIELD_PER at a time, so only a batch of model
+        objects is held at once. The query runs on the first next().
+        """
+        if limit and page_reverse:
+            # The reversed page has to be loaded before it is returned
+            for item in self._get_collection(
+                    context, model, dict_func, filters=filters,
+                    fields=fields, sorts=sorts, limit=limit,
+                    marker_obj=marker_obj, page_reverse=page_reverse):
+                yield item
+            return
+        query = self._get_collection_query(context, model, filters=filters,
+                                           sorts=sorts,
+                                           limit=limit,
+                                           marker_obj=marker_obj,
+                                           page_reverse=page_reverse,
+                                           read_only=True)
+        query = self._load_only(query, model, fields)
+        for c in query.yield_per(YIELD_PER):
+            yield dict_func(c, fields)
+
     def _get_collection_count(self, context, model, filters=None):
-        return self._get_collection_query(context, model, filters).count()
+        return self._get_collection_query(context, model, filters,
+                                          read_only=True).count()
 
     def _get_marker_obj(self, context, resource, limit, marker):
         if limit and marker:
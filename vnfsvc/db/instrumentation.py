@@ -0,0 +1,185 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""SQL statement accounting for API requests and RPC callbacks.
+
+Engine events count and time every statement. Statements are attributed
+to the scope (API request or RPC callback) active in the current
+greenthread, see scope(). When a scope ends its statements are checked
+for repeated identical shapes, the usual sign of an N+1 query pattern.
+"""
+
+import contextlib
+import re
+import threading
+
+from oslo.config import cfg
+from sqlalchemy import event
+
+from vnfsvc.common import utils
+from vnfsvc.openstack.common.gettextutils import _
+from vnfsvc.openstack.common import local
+from vnfsvc.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+instrumentation_opts = [
+    cfg.BoolOpt('sql_instrumentation', default=True,
+                help=_("Count and time SQL statements per API request and "
+                       "RPC callback")),
+    cfg.FloatOpt('slow_query_threshold', default=1.0,
+                 help=_("Log SQL statements taking longer than this many "
+                        "seconds")),
+    cfg.IntOpt('repeated_query_threshold', default=10,
+               help=_("Warn when a statement of the same shape runs at "
+                      "least this many times within one API request or "
+                      "RPC callback (possible N+1 query pattern)")),
+]
+cfg.CONF.register_opts(instrumentation_opts, 'database')
+
+# Collapses the placeholders of IN lists so that queries only differing by
+# the number of bound values share the same shape.
+_IN_LIST = re.compile(r'\((\s*(\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)')
+
+_lock = threading.Lock()
+_totals = {}
+_pool_stats = {'checkouts': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+
+
+class ScopeStats(object):
+    """Statements executed within one API request or RPC callback."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        shape = _IN_LIST.sub('(...)', statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+
+def _current():
+    return getattr(local.strong_store, 'sql_scope', None)
+
+
+@contextlib.contextmanager
+def scope(name):
+    """Attributes the SQL statements run in the block to name."""
+    if not cfg.CONF.database.sql_instrumentation:
+        yield None
+        return
+    previous = _current()
+    stats = ScopeStats(name)
+    local.strong_store.sql_scope = stats
+    try:
+        yield stats
+    finally:
+        local.strong_store.sql_scope = previous
+        _close_scope(stats)
+
+
+def _close_scope(stats):
+    if not stats.count:
+        return
+    LOG.debug(_("%(scope)s ran %(count)d SQL statements in %(time).3fs"),
+              {'scope': stats.name, 'count': stats.count,
+               'time': stats.duration})
+    threshold = cfg.CONF.database.repeated_query_threshold
+    for shape, count in stats.shapes.iteritems():
+        if threshold and count >= threshold:
+            LOG.warning(_("Possible N+1 query pattern in %(scope)s: "
+                          "statement ran %(count)d times: %(statement)s"),
+                        {'scope': stats.name, 'count': count,
+                         'statement': shape})
+    with _lock:
+        totals = _totals.setdefault(stats.name, {'scopes': 0,
+                                                 'statements': 0,
+                                                 'duration': 0.0})
+        totals['scopes'] += 1
+        totals['statements'] += stats.count
+        totals['duration'] += stats.duration
+
+
+def get_stats():
+    """Returns the accumulated per-scope and connection pool statistics."""
+    with _lock:
+        scopes = dict((name, dict(values))
+                      for name, values in _totals.iteritems())
+        pool = dict(_pool_stats)
+    return {'scopes': scopes, 'pool': pool}
+
+
+# NOTE: the start time is kept on the execution context of the statement,
+# which is discarded with it, the after hook is not run for statements
+# that raise.
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context._vnfsvc_start_time = utils.monotonic()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = getattr(context, '_vnfsvc_start_time', None)
+    if start is None:
+        return
+    duration = utils.monotonic() - start
+    stats = _current()
+    if stats is not None:
+        stats.add(statement, duration)
+    if duration >= cfg.CONF.database.slow_query_threshold:
+        LOG.warning(_("Slow SQL statement (%(time).3fs) in %(scope)s: "
+                      "%(statement)s"),
+                    {'time': duration,
+                     'scope': stats.name if stats else '-',
+                     'statement': statement})
+
+
+def _record_checkout_wait(wait):
+    with _lock:
+        _pool_stats['checkouts'] += 1
+        _pool_stats['wait_total'] += wait
+        _pool_stats['wait_max'] = max(_pool_stats['wait_max'], wait)
+
+
+def _instrument_pool(pool):
+    # NOTE: SQLAlchemy only signals checkouts once a connection has been
+    # handed out, so the blocking get of the pool is wrapped to measure
+    # how long callers wait for a free connection.
+    do_get = getattr(pool, '_do_get', None)
+    if do_get is None:
+        return
+
+    def _timed_do_get():
+        start = utils.monotonic()
+        try:
+            return do_get()
+        finally:
+            _record_checkout_wait(utils.monotonic() - start)
+
+    pool._do_get = _timed_do_get
+
+
+def instrument_engine(engine):
+    """Registers the statement and pool hooks on engine."""
+    if not cfg.CONF.database.sql_instrumentation:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    _instrument_pool(engine.pool)
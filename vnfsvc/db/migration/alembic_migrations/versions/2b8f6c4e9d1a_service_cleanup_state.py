@@ -0,0 +1,43 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""resources of network services removed on delete
+
+Revision ID: 2b8f6c4e9d1a
+Revises: 7e4b2d9c1a6f
+Create Date: 2026-10-20 09:12:44.503127
+
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8f6c4e9d1a'
+down_revision = '7e4b2d9c1a6f'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('networkservices',
+                  sa.Column('puppet_id', sa.String(36), nullable=True))
+    op.add_column('vdus',
+                  sa.Column('image_created', sa.Boolean(), nullable=False,
+                            server_default=sa.sql.false()))
+
+
+def downgrade(active_plugins=None, options=None):
+    op.drop_column('vdus', 'image_created')
+    op.drop_column('networkservices', 'puppet_id')
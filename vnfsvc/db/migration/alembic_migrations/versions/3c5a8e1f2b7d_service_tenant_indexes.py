@@ -0,0 +1,46 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""tenant ownership and listing indexes for network services
+
+Revision ID: 3c5a8e1f2b7d
+Revises: folsom
+Create Date: 2026-10-19 10:12:31.402117
+
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5a8e1f2b7d'
+down_revision = 'folsom'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('networkservices',
+                  sa.Column('tenant_id', sa.String(255), nullable=True))
+    op.create_index('ix_networkservices_tenant_id_status',
+                    'networkservices', ['tenant_id', 'status'])
+    op.create_index('ix_networkservices_tenant_id_service_type',
+                    'networkservices', ['tenant_id', 'service_type'])
+
+
+def downgrade(active_plugins=None, options=None):
+    op.drop_index('ix_networkservices_tenant_id_service_type',
+                  'networkservices')
+    op.drop_index('ix_networkservices_tenant_id_status', 'networkservices')
+    op.drop_column('networkservices', 'tenant_id')
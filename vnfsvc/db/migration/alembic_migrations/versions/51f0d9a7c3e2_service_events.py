@@ -0,0 +1,54 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""deployment phase timing ledger
+
+Revision ID: 51f0d9a7c3e2
+Revises: 3c5a8e1f2b7d
+Create Date: 2026-10-19 11:40:07.118520
+
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = '51f0d9a7c3e2'
+down_revision = '3c5a8e1f2b7d'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.create_table(
+        'service_events',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('tenant_id', sa.String(255), nullable=True),
+        sa.Column('service_id', sa.String(36), nullable=False),
+        sa.Column('phase', sa.String(64), nullable=False),
+        sa.Column('vdu', sa.String(255), nullable=True),
+        sa.Column('started_at', sa.DateTime, nullable=False),
+        sa.Column('duration', sa.Float, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_service_events_tenant_id',
+                    'service_events', ['tenant_id'])
+    op.create_index('ix_service_events_service_id',
+                    'service_events', ['service_id'])
+    op.create_index('ix_service_events_phase', 'service_events', ['phase'])
+
+
+def downgrade(active_plugins=None, options=None):
+    op.drop_table('service_events')
@@ -0,0 +1,40 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""row revision of network services
+
+Revision ID: 7e4b2d9c1a6f
+Revises: 51f0d9a7c3e2
+Create Date: 2026-10-19 14:41:08.215734
+
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = '7e4b2d9c1a6f'
+down_revision = '51f0d9a7c3e2'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('networkservices',
+                  sa.Column('revision', sa.Integer(), nullable=False,
+                            server_default='1'))
+
+
+def downgrade(active_plugins=None, options=None):
+    op.drop_column('networkservices', 'revision')
@@ -15,27 +15,33 @@
 
 import uuid
 import ast
+import hashlib
+import math
 
+from oslo.config import cfg
 import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import exc as orm_exc
 
 from vnfsvc.api.v2 import attributes
+from vnfsvc.api.v2 import response_cache
 from vnfsvc.common import exceptions
+from vnfsvc.common import utils
+from vnfsvc.common import watch
 from vnfsvc.db import common_db_mixin as base_db
 from vnfsvc.db import model_base
 from vnfsvc import manager
 from vnfsvc.openstack.common import jsonutils
 from vnfsvc.openstack.common import log as logging
+from vnfsvc.openstack.common import timeutils
 from vnfsvc import constants
 from vnfsvc.openstack.common import uuidutils
-from vnfsvc.openstack.common.gettextutils import _
 from vnfsvc.api.v2 import vnf
 
 LOG = logging.getLogger(__name__)
 _ACTIVE_UPDATE = (constants.ACTIVE, constants.PENDING_UPDATE)
 
-service_db_dict={}
+
 class HasTenant(object):
     """Tenant mixin, add to subclasses that have a tenant."""
 
@@ -50,9 +56,17 @@ class HasId(object):
                    default=uuidutils.generate_uuid)
 
 
-class NetworkService(model_base.BASEV2):
+class NetworkService(model_base.BASEV2, HasTenant):
     """Represents binding of Network service details
     """
+    __table_args__ = (
+        sa.Index('ix_networkservices_tenant_id_status',
+                 'tenant_id', 'status'),
+        sa.Index('ix_networkservices_tenant_id_service_type',
+                 'tenant_id', 'service_type'),
+        model_base.BASEV2.__table_args__
+    )
+
     id = sa.Column(sa.String(36), primary_key=True, nullable=False)
     vnfm_id = sa.Column(sa.String(4000),nullable=False)
     vdus = sa.Column(sa.String(4000), nullable=False)
@@ -60,8 +74,12 @@ class NetworkService(model_base.BASEV2):
     subnets = sa.Column(sa.String(4000), nullable=False)
     router = sa.Column(sa.String(4000), nullable=False)
     service_type = sa.Column(sa.String(36), nullable=False)
-    #puppet_id = sa.Column(sa.String(36), nullable=False)
+    puppet_id = sa.Column(sa.String(36))
     status = sa.Column(sa.String(36), nullable=False)
+    # Incremented on every update, identifies the version of the row in
+    # the ETags of API responses
+    revision = sa.Column(sa.Integer, nullable=False, default=1,
+                         server_default='1')
 
 
 class Vdu(model_base.BASEV2):
@@ -71,6 +89,32 @@ class Vdu(model_base.BASEV2):
     instances = sa.Column(sa.String(4000),nullable=False)
     flavor = sa.Column(sa.String(36),nullable=False)
     image = sa.Column(sa.String(36),nullable=False)
+    # True when the image was uploaded for the VDU, and is deleted with it
+    image_created = sa.Column(sa.Boolean, nullable=False, default=False,
+                              server_default=sa.sql.false())
+
+
+class ServiceEvent(model_base.BASEV2, HasId, HasTenant):
+    """Append-only ledger of deployment phase timings of a service
+    """
+    __tablename__ = 'service_events'
+    __table_args__ = (
+        sa.Index('ix_service_events_tenant_id', 'tenant_id'),
+        model_base.BASEV2.__table_args__
+    )
+    service_id = sa.Column(sa.String(36), nullable=False, index=True)
+    phase = sa.Column(sa.String(64), nullable=False, index=True)
+    vdu = sa.Column(sa.String(255))
+    started_at = sa.Column(sa.DateTime, nullable=False)
+    # seconds, measured on the monotonic clock
+    duration = sa.Column(sa.Float, nullable=False)
+    created_at = sa.Column(sa.DateTime, nullable=False)
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a sorted list."""
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(index, 0)]
 
 
 ###########################################################################
@@ -79,7 +123,7 @@ class NetworkServicePluginDb(base_db.CommonDbMixin):
 
     @property
     def _core_plugin(self):
-        return manager.VnfsvcManager.get_plugin()
+        return manager.VNFSvcManager.get_plugin()
 
 
     def subnet_id_to_network_id(self, context, subnet_id):
@@ -92,11 +136,14 @@ class NetworkServicePluginDb(base_db.CommonDbMixin):
 
 
     def _make_service_dict(self, service_db, fields=None):
-        LOG.debug(_('service_db %s'), service_db)
         res = {}
-        key_list = ('id', 'vnfm_id', 'vdus', 'networks', 'subnets','router','service_type','status')
+        key_list = ('id', 'tenant_id', 'vnfm_id', 'vdus', 'networks',
+                    'subnets', 'router', 'service_type', 'status', 'revision')
+        if fields:
+            # Columns not requested may not have been loaded
+            key_list = [key for key in key_list if key in fields]
         res.update((key, service_db[key]) for key in key_list)
-        return self._fields(res, fields)
+        return res
 
 
     def populate_vdu_details(self, context, nsd):
@@ -109,13 +156,15 @@ class NetworkServicePluginDb(base_db.CommonDbMixin):
         return vdus
 
 
-    def update_vdu_details(self, context, flavor_id, image_id, vdu_id):
+    def update_vdu_details(self, context, flavor_id, image_id, vdu_id,
+                           image_created=False):
         with context.session.begin(subtransactions=True):
             vdu = self._model_query(context, Vdu).filter(Vdu.id==vdu_id).first()
             if vdu:
                 vdu.update({
                     'flavor': flavor_id,
-                    'image': image_id
+                    'image': image_id,
+                    'image_created': image_created
                     })
             else:
                 raise exceptions.NoSuchVDUException()
@@ -141,11 +190,13 @@ class NetworkServicePluginDb(base_db.CommonDbMixin):
             nsd = self._model_query(context, NetworkService).filter(NetworkService.id==nsd_id).first()
             if nsd:
                 nsd.update({
-                    'status': status
+                    'status': status,
+                    'revision': NetworkService.revision + 1
                     })
             else:
                 raise exceptions.NoSuchNSDException()
             context.session.add(nsd)
+        watch.services.notify(nsd_id)
 
     def create_service_model(self, context, **db_dict):
         nsd = db_dict['nsd']
@@ -158,51 +209,212 @@ class NetworkServicePluginDb(base_db.CommonDbMixin):
             if_name = router['if_name']
             router['id'] = nsd['router'][if_name]['id']
             service_type = db_dict['service']['name']
+            tenant_id = self._get_tenant_id_for_create(context,
+                                                       db_dict['service'])
             vdus = str(self.populate_vdu_details(context, nsd))
-            #puppet = nsd.get('puppet-master', None)
-            #if puppet:
-            #    puppet_id = puppet.get('instance_id', '')
-            #else:
-            #    puppet_id = ''
+            puppet_id = nsd.get('puppet-master', {}).get('instance_id')
             status = db_dict['status']
-            service_db = NetworkService(id=id, vnfm_id=vnfm_id, networks=networks, subnets=subnets, 
-                    vdus=vdus, router=str(router), service_type=service_type, status=status)
+            values = dict(tenant_id=tenant_id, vnfm_id=vnfm_id,
+                          networks=networks, subnets=subnets, vdus=vdus,
+                          router=str(router), service_type=service_type,
+                          puppet_id=puppet_id, status=status)
+            # The service may have been recorded while queued for admission
+            service_db = self._model_query(context, NetworkService).filter(
+                NetworkService.id == id).first()
+            if service_db:
+                values['revision'] = NetworkService.revision + 1
+                service_db.update(values)
+            else:
+                service_db = NetworkService(id=id, **values)
+            context.session.add(service_db)
+            # Applies the revision default or increment before it is read
+            context.session.flush()
+            service = self._make_service_dict(service_db)
+        watch.services.notify(id)
+        return service
+
+    def create_queued_service_model(self, context, nsd_id, service, status):
+        """Records a service waiting for admission of its deployment."""
+        with context.session.begin(subtransactions=True):
+            tenant_id = self._get_tenant_id_for_create(context, service)
+            service_db = NetworkService(id=nsd_id, tenant_id=tenant_id,
+                                        vnfm_id='', networks='', subnets='',
+                                        vdus='{}', router='',
+                                        service_type=service['name'],
+                                        status=status)
             context.session.add(service_db)
-            return self._make_service_dict(service_db)
+
+    def delete_queued_service_model(self, context, nsd_id):
+        """Deletes a service recorded while queued, unless deployed since."""
+        with context.session.begin(subtransactions=True):
+            count = self._model_query(context, NetworkService).filter(
+                NetworkService.id == nsd_id,
+                NetworkService.vnfm_id == '').delete(
+                    synchronize_session=False)
+        if count:
+            response_cache.invalidate(nsd_id)
+            watch.services.notify(nsd_id)
+
+    def _get_vdu_ids(self, service_db):
+        return ast.literal_eval(service_db.vdus).values()
 
     def delete_service_model(self, context, nsd_id):
-        instances_list=[]
+        service_db_dict = {}
         try:
             with context.session.begin(subtransactions=True):
-                service_db = self._model_query(context, NetworkService).filter(NetworkService.id == nsd_id).all()
-                service_db_dict['service_db']=service_db
-                service_dict = service_db[0].__dict__
-                vduid_list = ast.literal_eval(service_dict['vdus']).values()
-                for vdu_id in range(len(vduid_list)):
-                   instances = self._model_query(context, Vdu).filter(Vdu.id == vduid_list[vdu_id]).all()
-                   instances_list.append(instances)
-                service_db_dict['instances']=instances_list
+                service_db = self._model_query(context, NetworkService).filter(
+                    NetworkService.id == nsd_id).one()
+                vduid_list = self._get_vdu_ids(service_db)
+                vdus = []
+                if vduid_list:
+                    vdus = self._model_query(context, Vdu).filter(
+                        Vdu.id.in_(vduid_list)).all()
+                service_db_dict['service_db'] = [service_db]
+                service_db_dict['instances'] = vdus
         except Exception as e:
             return None
         return service_db_dict
 
-    def delete_db_dict(self, context, nsd_id):
-        service_db = self._model_query(context, NetworkService).filter(NetworkService.id == nsd_id).all()
-        service_dict = service_db[0].__dict__
-        vduid_list = ast.literal_eval(service_dict['vdus']).values()
-        for vdu_id in range(len(vduid_list)):
-           instances = self._model_query(context, Vdu).filter(Vdu.id == vduid_list[vdu_id]).all()
-           self._model_query(context, Vdu).filter(Vdu.id == vduid_list[vdu_id]).delete()
-        self._model_query(context, NetworkService).filter(NetworkService.id == nsd_id).delete()
+    def delete_db_dict(self, context, nsd_id, service_db_dict=None):
+        with context.session.begin(subtransactions=True):
+            if service_db_dict:
+                service_db = service_db_dict['service_db'][0]
+            else:
+                service_db = self._model_query(context, NetworkService).filter(
+                    NetworkService.id == nsd_id).one()
+            vduid_list = self._get_vdu_ids(service_db)
+            if vduid_list:
+                self._model_query(context, Vdu).filter(
+                    Vdu.id.in_(vduid_list)).delete(synchronize_session=False)
+            self._model_query(context, NetworkService).filter(
+                NetworkService.id == nsd_id).delete(synchronize_session=False)
+        response_cache.invalidate(nsd_id)
+        watch.services.notify(nsd_id)
 
     def get_service_model(self, context, nsd_id, fields=None):
         try:
-            service_db = self._model_query(context, NetworkService).filter(NetworkService.id == nsd_id).one()
+            query = self._model_query(
+                context, NetworkService, read_only=True).filter(
+                    NetworkService.id == nsd_id)
+            service_db = self._load_only(query, NetworkService,
+                                         fields).one()
             return self._make_service_dict(service_db, fields)
         except Exception:
             return {}
 
     def get_all_services(self, context, filters=None, fields=None):
-        return self._get_collection(context, NetworkService, self._make_service_dict,
-                                    filters=filters, fields=fields)
+        return self._iter_collection(context, NetworkService,
+                                     self._make_service_dict,
+                                     filters=filters, fields=fields)
+
+    def get_service_revision(self, context, nsd_id):
+        # NOTE: read from the primary, a lagging replica would validate
+        # stale ETags
+        row = self._model_query(context, NetworkService).filter(
+            NetworkService.id == nsd_id).with_entities(
+                NetworkService.revision).first()
+        return row[0] if row else None
+
+    def wait_for_service_change(self, context, nsd_id, revision,
+                                timeout=None):
+        """Waits until the revision of a service differs from revision.
+
+        Returns when the service changes or is deleted, or after timeout
+        seconds, capped by watch_timeout_max. Changes made in this process
+        wake the waiter at once, the database is also checked every
+        watch_poll_interval seconds for changes made by other API workers.
+        """
+        timeout_max = cfg.CONF.watch_timeout_max
+        if timeout is None or timeout > timeout_max:
+            timeout = timeout_max
+        deadline = utils.monotonic() + timeout
+        while self.get_service_revision(context, nsd_id) == revision:
+            remaining = deadline - utils.monotonic()
+            if remaining <= 0:
+                return
+            watch.services.wait(
+                nsd_id, min(remaining, cfg.CONF.watch_poll_interval))
+
+    def get_services_revision(self, context, filters=None):
+        query = self._apply_filters_to_query(
+            self._model_query(context, NetworkService), NetworkService,
+            filters)
+        digest = hashlib.md5()
+        for id, revision in query.with_entities(
+                NetworkService.id, NetworkService.revision).order_by(
+                    NetworkService.id):
+            digest.update('%s:%d;' % (id, revision))
+        return digest.hexdigest()
+
+    def _make_service_event_dict(self, event_db, fields=None):
+        key_list = ('id', 'tenant_id', 'service_id', 'phase', 'vdu',
+                    'started_at', 'duration', 'created_at')
+        if fields:
+            key_list = [key for key in key_list if key in fields]
+        return dict((key, event_db[key]) for key in key_list)
+
+    def create_service_event(self, context, nsd_id, phase, started_at,
+                             duration, vdu=None):
+        with context.session.begin(subtransactions=True):
+            event_db = ServiceEvent(id=uuidutils.generate_uuid(),
+                                    tenant_id=context.tenant_id,
+                                    service_id=nsd_id, phase=phase, vdu=vdu,
+                                    started_at=started_at, duration=duration,
+                                    created_at=timeutils.utcnow())
+            context.session.add(event_db)
+        return self._make_service_event_dict(event_db)
+
+    def get_service_event(self, context, id, fields=None):
+        event_db = self._model_query(context, ServiceEvent,
+                                     read_only=True).filter(
+                                         ServiceEvent.id == id).one()
+        return self._make_service_event_dict(event_db, fields)
+
+    def get_service_events(self, context, filters=None, fields=None,
+                           **kwargs):
+        return self._get_collection(context, ServiceEvent,
+                                    self._make_service_event_dict,
+                                    filters=filters, fields=fields,
+                                    sorts=[('created_at', True),
+                                           ('started_at', True)])
+
+    def get_service_phase_stats(self, context, filters=None, fields=None,
+                                **kwargs):
+        """Aggregate phase durations across the matching services."""
+        query = self._model_query(context, ServiceEvent, read_only=True)
+        query = self._apply_filters_to_query(query, ServiceEvent, filters)
+        durations = {}
+        for phase, duration in query.with_entities(ServiceEvent.phase,
+                                                   ServiceEvent.duration):
+            durations.setdefault(phase, []).append(duration)
+        stats = []
+        for phase, values in sorted(durations.iteritems()):
+            values.sort()
+            res = {'phase': phase,
+                   'count': len(values),
+                   'p50': _percentile(values, 50),
+                   'p90': _percentile(values, 90),
+                   'p99': _percentile(values, 99),
+                   'max': values[-1]}
+            stats.append(self._fields(res, fields))
+        return stats
+
+    def _service_name_filter_hook(self, query, filters):
+        # The API exposes the service template name as 'name', which is
+        # stored in the indexed service_type column.
+        names = filters.get('name')
+        if names:
+            query = query.filter(NetworkService.service_type.in_(names))
+        return query
+
+
+def _invalidate_cached_service(mapper, connection, target):
+    response_cache.invalidate(target.id)
+
+
+sa.event.listen(NetworkService, 'after_update', _invalidate_cached_service)
+sa.event.listen(NetworkService, 'after_delete', _invalidate_cached_service)
+
+NetworkServicePluginDb.register_model_query_hook(
+    NetworkService, 'service_name', None, None, '_service_name_filter_hook')
 
@@ -132,6 +132,14 @@ class VNFSvcManager(object):
             cls._create_instance()
         return cls._instance
 
+    @classmethod
+    def stop_plugin(cls):
+        """Lets the plugin, if loaded, release what it started."""
+        if cls.has_instance():
+            plugin = cls._instance.plugin
+            if hasattr(plugin, 'stop'):
+                plugin.stop()
+
     @classmethod
     def get_plugin(cls):
         # Return a weakref to minimize gc-preventing references.
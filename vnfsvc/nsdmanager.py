@@ -45,10 +45,20 @@ class Configuration(object):
         self.novaclient = client.NovaClient()
         self.neutronclient = client.NeutronClient()
 
-    def preconfigure(self):
+    def preconfigure(self, timer=None):
+        """Runs every preconfigure step of the NSD.
+
+        :param timer: optional callable taking a step name and returning
+                      a context manager which times that step.
+        """
         for key in self.nsd['preconfigure']:
             method_key = key.replace('-','_')
-            getattr(self, method_key)(self.nsd['preconfigure'][key])
+            step = getattr(self, method_key)
+            if timer is None:
+                step(self.nsd['preconfigure'][key])
+                continue
+            with timer(method_key):
+                step(self.nsd['preconfigure'][key])
         return self.nsd
 
     def router(self, data):
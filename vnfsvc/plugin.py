@@ -13,21 +13,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import copy
+import functools
 import json
 import os
 import uuid
 import shutil
 import six
 import eventlet
-import pexpect
 import tarfile
 import time
-import sys 
 import re
 import yaml
 import ast
 import subprocess
-import traceback
 
 from collections import OrderedDict
 from distutils import dir_util
@@ -49,14 +49,18 @@ from vnfsvc.openstack.common.gettextutils import _
 from vnfsvc.openstack.common import excutils
 from vnfsvc.openstack.common import log as logging
 from vnfsvc.openstack.common import importutils
+from vnfsvc.openstack.common import timeutils
 
 from vnfsvc.client import client
+from vnfsvc.common import admission
 
 from vnfsvc.common import driver_manager
 from vnfsvc.common import exceptions
 from vnfsvc.common import rpc as v_rpc
 from vnfsvc.common import topics
-#from vnfsvc.common import utils
+from vnfsvc.common import utils as common_utils
+from vnfsvc.common import vnfm_pool
+from vnfsvc.agent.linux import remote
 from vnfsvc.agent.linux import utils
 
 from vnfsvc.common.yaml.nsdparser import NetworkParser
@@ -68,6 +72,8 @@ LOG = logging.getLogger(__name__)
 class VNFPlugin(vnf_db.NetworkServicePluginDb):
     """VNFPlugin which provide support to OpenVNF framework"""
 
+    __native_bulk_support = True
+
     #register vnf driver 
     OPTS = [
         cfg.MultiStrOpt(
@@ -97,6 +103,26 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
         cfg.StrOpt(
             'ssh_pwd', default='',
             help=_('ssh_pwd')),
+        cfg.StrOpt(
+            'ssh_key_file', default='',
+            help=_('Private key ansible logs into the compute host with, '
+                   'ssh_pwd is used when not set')),
+        cfg.IntOpt(
+            'ansible_timeout', default=600,
+            help=_('Seconds an ansible playbook run is given before it is '
+                   'stopped')),
+        cfg.StrOpt(
+            'remote_executor', default='ssh',
+            help=_('How vnfmconf ssh runs commands: ssh on the compute '
+                   'host, or local to run them in a local shell instead')),
+        cfg.IntOpt(
+            'ssh_control_persist', default=600,
+            help=_('Seconds the SSH connection to a compute host is kept '
+                   'open once idle, for vnfmconf ssh')),
+        cfg.IntOpt(
+            'ssh_command_timeout', default=300,
+            help=_('Seconds a command or copy over SSH is given before it '
+                   'is stopped, for vnfmconf ssh')),
         cfg.StrOpt(
             'ovs_bridge', default='br-int',
             help=_('ovs_bridge')),
@@ -109,6 +135,36 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
         cfg.StrOpt(
             'vnfmconf', default='local',
             help=_('VNFManager Configuaration')),
+        cfg.IntOpt(
+            'bulk_create_fanout', default=4,
+            help=_('Number of services of a bulk create request deployed '
+                   'concurrently')),
+        cfg.IntOpt(
+            'agent_client_pool_size', default=256,
+            help=_('Maximum number of VNF manager RPC clients kept open, '
+                   'the least recently used ones are closed first')),
+        cfg.BoolOpt(
+            'vnfm_shared', default=False,
+            help=_('Run a single long-lived VNF manager on the compute '
+                   'host serving all the services, instead of one VNF '
+                   'manager per service')),
+        cfg.IntOpt(
+            'control_rpc_workers', default=0,
+            help=_('Acknowledgements from VNF managers handled at once, '
+                   '0 for the size of the RPC thread pool')),
+        cfg.IntOpt(
+            'rpc_workers', default=0,
+            help=_('Other messages from VNF managers handled at once, 0 '
+                   'for the size of the RPC thread pool')),
+        cfg.IntOpt(
+            'vnfm_pool_size', default=0,
+            help=_('Number of idle VNF managers kept started, per API '
+                   'worker, to be claimed by new services. Only used with '
+                   'vnfmconf local, 0 to start VNF managers with their '
+                   'service')),
+        cfg.IntOpt(
+            'vnfm_start_timeout', default=60,
+            help=_('Seconds an idle VNF manager is given to be ready')),
     ]
     cfg.CONF.register_opts(OPTS, 'vnf')
     conf = cfg.CONF
@@ -120,25 +176,75 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
         self.neutronclient = client.NeutronClient()
         self._pool = eventlet.GreenPool()
         self.conf = cfg.CONF
-        self.is_manager_invoked =  False
+        self.host_managers = set()
+        self.remote_executors = dict()
         self.ns_dict = dict()
+        self.admission = admission.AdmissionController.from_config()
 
         config.register_root_helper(self.conf)
         self.root_helper = config.get_root_helper(self.conf)
-        self.agent_mapping = dict()
+        self.agent_clients = v_rpc.ClientPool(
+            self.conf.vnf.agent_client_pool_size,
+            lambda topic: VNFManagerAgentApi(topic, cfg.CONF.host, self))
 
         self.endpoints = [VNFManagerCallbacks(self)]
         self.conn = v_rpc.create_connection(new=True)
+        # Acks have their own topic and executor, so that they are not
+        # delayed by other traffic. VNF managers not yet using the control
+        # topic still send them on topics.PLUGIN.
         self.conn.create_consumer(
-            topics.PLUGIN, self.endpoints, fanout=False)
+            topics.PLUGIN, self.endpoints, fanout=False,
+            workers=self.conf.vnf.rpc_workers)
+        self.conn.create_consumer(
+            topics.PLUGIN_CONTROL, self.endpoints, fanout=False,
+            workers=self.conf.vnf.control_rpc_workers)
+        if cfg.CONF.api_workers > 0:
+            # Acks are delivered to any API worker, the ones for services
+            # deployed by another worker are forwarded to all of them. The
+            # control topic server above also consumes its fanout queue.
+            self.plugin_api = VNFPluginApi(topics.PLUGIN_CONTROL)
 
         self.conn.consume_in_threads()
 
+        self.vnfm_pool = None
+        if (self.conf.vnf.vnfm_pool_size > 0 and
+                self.conf.vnf.vnfmconf == "local" and
+                not self.conf.vnf.vnfm_shared):
+            self.vnfm_pool = vnfm_pool.VNFManagerPool(
+                self.conf.vnf.vnfm_pool_size, self._start_idle_manager,
+                self._stop_vnf_manager)
+            self.vnfm_pool.refill()
+
 
     def spawn_n(self, function, *args, **kwargs):
         self._pool.spawn_n(function, *args, **kwargs)
 
 
+    def stop(self):
+        """Stops the idle VNF managers of the pool, on shutdown."""
+        if self.vnfm_pool is not None:
+            self.vnfm_pool.close()
+
+
+    @contextlib.contextmanager
+    def _phase(self, context, nsd_id, phase, vdu=None):
+        """Times a deployment phase and appends it to the service ledger.
+
+        Only completed phases are recorded, a phase that raises is not.
+        """
+        started_at = timeutils.utcnow()
+        start = common_utils.monotonic()
+        yield
+        duration = common_utils.monotonic() - start
+        try:
+            self.create_service_event(context, nsd_id, phase,
+                                      started_at, duration, vdu=vdu)
+        except Exception:
+            LOG.exception(_('Unable to record %(phase)s event for '
+                            'service %(nsd_id)s'),
+                          {'phase': phase, 'nsd_id': nsd_id})
+
+
     def _get_networks(self, ns_info):
         return ns_info['attributes']['networks']
 
@@ -154,7 +260,23 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
     def _get_name(self, ns_info):
         return ns_info['name']
 
-    def _ns_dict_init(self, service, nsd_id):
+    def _load_template(self, path, loader, templates=None):
+        """Loads a template file.
+
+        With a templates cache each file is read and parsed only once, a
+        deep copy of the parsed template is returned since the parsers
+        modify it.
+        """
+        if templates is None:
+            with open(path, 'r') as f:
+                return loader(f)
+        if path not in templates:
+            with open(path, 'r') as f:
+                templates[path] = loader(f)
+        return copy.deepcopy(templates[path])
+
+
+    def _ns_dict_init(self, service, nsd_id, templates=None):
         ns_info = {}
         ns_info[nsd_id] = service['service']
         self.ns_dict[nsd_id]= {}
@@ -165,6 +287,7 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
         self.ns_dict[nsd_id]['flavor_list'] = []
         self.ns_dict[nsd_id]['puppet'] = ''
         self.ns_dict[nsd_id]['conf_generated'] = []
+        self.ns_dict[nsd_id]['vnfm_conf'] = {'version': 0, 'service': {}}
         self.ns_dict[nsd_id]['vnfmanager_uuid'] = str(uuid.uuid4())
         self.ns_dict[nsd_id]['acknowledge_list'] = dict()
         self.ns_dict[nsd_id]['deployed_vdus'] = list()
@@ -179,82 +302,207 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
         self.ns_dict[nsd_id]['subnets'] = self._get_subnets(ns_info[nsd_id])
         self.ns_dict[nsd_id]['qos'] = self._get_qos(ns_info[nsd_id])
         
-        self.ns_dict[nsd_id]['templates_json'] = json.load(
-                                       open(self.conf.vnf.templates, 'r'))
+        self.ns_dict[nsd_id]['templates_json'] = self._load_template(
+                                       self.conf.vnf.templates, json.load,
+                                       templates)
 
-        self.ns_dict[nsd_id]['nsd_template'] = yaml.load(open(
+        self.ns_dict[nsd_id]['nsd_template'] = self._load_template(
                           self.ns_dict[nsd_id]['templates_json']['nsd']\
-                          [self.ns_dict[nsd_id]['service_name']], 'r'))['nsd']
-
+                          [self.ns_dict[nsd_id]['service_name']], yaml.load,
+                          templates)['nsd']
 
-    def create_service(self, context, service):
-        nsd_id = str(uuid.uuid4())
-        nsd_dict = {}
-        nsd_dict['id'] = nsd_id
-        nsd_dict['check'] = ''
 
-        try:
-            self._ns_dict_init(service, nsd_id)
+    def _parse_service(self, context, service, nsd_id, templates=None):
+        with self._phase(context, nsd_id, 'parse'):
+            self._ns_dict_init(service, nsd_id, templates)
 
             self.ns_dict[nsd_id]['nsd_template'] = NetworkParser(
-                                self.ns_dict[nsd_id]['nsd_template']).parse(
-                                             self.ns_dict[nsd_id]['qos'],
-                                             self.ns_dict[nsd_id]['networks'] ,
-                                             self.ns_dict[nsd_id]['router'],
-                                             self.ns_dict[nsd_id]['subnets'])
+                            self.ns_dict[nsd_id]['nsd_template']).parse(
+                                         self.ns_dict[nsd_id]['qos'],
+                                         self.ns_dict[nsd_id]['networks'] ,
+                                         self.ns_dict[nsd_id]['router'],
+                                         self.ns_dict[nsd_id]['subnets'])
+
 
-            self.ns_dict[nsd_id]['nsd_template']['router'] = {}
-            self.ns_dict[nsd_id]['nsd_template'] = nsdmanager.Configuration(
-                               self.ns_dict[nsd_id]['nsd_template']).preconfigure()
+    def _deploy_service(self, context, service, nsd_id, templates=None):
+        self.ns_dict[nsd_id]['nsd_template']['router'] = {}
+        timer = functools.partial(self._phase, context, nsd_id)
+        self.ns_dict[nsd_id]['nsd_template'] = nsdmanager.Configuration(
+                           self.ns_dict[nsd_id]['nsd_template']).preconfigure(
+                                                             timer=timer)
 
+        with self._phase(context, nsd_id, 'parse_vnfds'):
             for vnfd in self.ns_dict[nsd_id]['nsd_template']['vnfds']:
-                vnfd_template = yaml.load(open(
-                               self.ns_dict[nsd_id]['templates_json']['vnfd'][vnfd],
-                               'r'))
+                vnfd_template = self._load_template(
+                           self.ns_dict[nsd_id]['templates_json']['vnfd'][vnfd],
+                           yaml.load, templates)
                 self.ns_dict[nsd_id]['vnfds'][vnfd] = dict()
                 self.ns_dict[nsd_id]['vnfds'][vnfd]['template'] = vnfd_template
                 self.ns_dict[nsd_id]['vnfds'][vnfd] = VNFParser(
-                               self.ns_dict[nsd_id]['vnfds'][vnfd],
-                               self.ns_dict[nsd_id]['qos'],
-                               self.ns_dict[nsd_id]['nsd_template']['vnfds'][vnfd],
-                               vnfd,
-                               self.ns_dict[nsd_id]['nsd_template']).parse()
+                           self.ns_dict[nsd_id]['vnfds'][vnfd],
+                           self.ns_dict[nsd_id]['qos'],
+                           self.ns_dict[nsd_id]['nsd_template']['vnfds'][vnfd],
+                           vnfd,
+                           self.ns_dict[nsd_id]['nsd_template']).parse()
                 self.ns_dict[nsd_id]['vnfds'][vnfd]['vnf_id'] = str(uuid.uuid4())
 
-            db_dict = {
-                'id': nsd_id,
-                'nsd': self.ns_dict[nsd_id]['nsd_template'],
-                'vnfds': self.ns_dict[nsd_id]['vnfds'],
-                'networks': self.ns_dict[nsd_id]['networks'],
-                'subnets': self.ns_dict[nsd_id]['subnets'],
-                'vnfm_id': self.ns_dict[nsd_id]['vnfmanager_uuid'],
-                'service': service['service'],
-                'status': 'PENDING'
-            }
-            #Create DB Entry for the new service
-            nsdb_dict = self.create_service_model(context, **db_dict)
-
-            #Launch VNFDs
-            self._create_vnfds(context,nsd_id)
-            self.update_nsd_status(context, nsd_id, 'ACTIVE')
+        db_dict = {
+            'id': nsd_id,
+            'nsd': self.ns_dict[nsd_id]['nsd_template'],
+            'vnfds': self.ns_dict[nsd_id]['vnfds'],
+            'networks': self.ns_dict[nsd_id]['networks'],
+            'subnets': self.ns_dict[nsd_id]['subnets'],
+            'vnfm_id': self.ns_dict[nsd_id]['vnfmanager_uuid'],
+            'service': service['service'],
+            'status': 'PENDING'
+        }
+        #Create DB Entry for the new service
+        nsdb_dict = self.create_service_model(context, **db_dict)
+
+        #Launch VNFDs
+        self._create_vnfds(context,nsd_id)
+        self.update_nsd_status(context, nsd_id, 'ACTIVE')
+        return nsdb_dict
+
+
+    @contextlib.contextmanager
+    def _admitted(self, context, service, nsd_id):
+        """Runs the block once the deployment of nsd_id is admitted.
+
+        While queued the service is recorded with its queue position as
+        status, then as PENDING once admitted. The recorded service is
+        deleted if the block fails before deploying it. Raises OverLimit
+        when the queue is full.
+        """
+        queued = []
+
+        def _queued(position):
+            status = 'QUEUED (%d)' % position
+            if queued:
+                self.update_nsd_status(context, nsd_id, status)
+            else:
+                self.create_queued_service_model(context, nsd_id,
+                                                 service['service'], status)
+                queued.append(nsd_id)
+
+        tenant_id = context.tenant_id
+        try:
+            self.admission.admit(tenant_id, _queued)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if queued:
+                    self.delete_db_dict(context, nsd_id)
+        try:
+            if queued:
+                self.update_nsd_status(context, nsd_id, 'PENDING')
+            yield
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if queued:
+                    self.delete_queued_service_model(context, nsd_id)
+        finally:
+            self.admission.release(tenant_id)
+
+
+    def create_service(self, context, service):
+        nsd_id = str(uuid.uuid4())
+        nsd_dict = {}
+        nsd_dict['id'] = nsd_id
+        nsd_dict['check'] = ''
+
+        try:
+            with self._admitted(context, service, nsd_id):
+                self._parse_service(context, service, nsd_id)
+                return self._deploy_service(context, service, nsd_id)
+        except exceptions.OverLimit:
+            raise
         except Exception as e:
-            print 'AN EXCEPTION HAS OCCURED'
-            traceback.print_exc(file=sys.stdout)
+            LOG.exception(_('Unable to create service %s'), nsd_id)
             nsd_dict['check'] = e
             return nsd_dict
-        return nsdb_dict
+
+
+    def create_service_bulk(self, context, service):
+        """Creates the services of a bulk request.
+
+        All templates are parsed before anything is deployed, a template
+        error fails the whole request. The services are then deployed
+        concurrently, vnf.bulk_create_fanout at a time, each with its own
+        DB session. A service failing to deploy is reported with its error
+        in 'check', like create_service does, and rolled back in the
+        background; the other services are kept. Every deployment goes through admission
+        control, services rejected as the queue is full are reported the
+        same way.
+        """
+        services = service['services']
+        templates = {}
+        nsd_ids = []
+        try:
+            for item in services:
+                nsd_id = str(uuid.uuid4())
+                nsd_ids.append(nsd_id)
+                self._parse_service(context, item, nsd_id, templates)
+                for vnfd in self.ns_dict[nsd_id]['nsd_template']['vnfds']:
+                    self._load_template(
+                        self.ns_dict[nsd_id]['templates_json']['vnfd'][vnfd],
+                        yaml.load, templates)
+        except Exception as e:
+            LOG.exception(_('Unable to parse the services of a bulk request'))
+            for nsd_id in nsd_ids:
+                self._discard_service(nsd_id)
+            raise exceptions.BadRequest(resource='service', msg=str(e))
+
+        pool = eventlet.GreenPool(self.conf.vnf.bulk_create_fanout)
+        deploy = functools.partial(self._deploy_bulk_member, context,
+                                   templates)
+        return list(pool.imap(deploy, services, nsd_ids))
+
+
+    def _deploy_bulk_member(self, context, templates, service, nsd_id):
+        member_context = context.copy_with_new_session()
+        try:
+            with self._admitted(member_context, service, nsd_id):
+                return self._deploy_service(member_context, service, nsd_id,
+                                            templates)
+        except exceptions.OverLimit as e:
+            self._discard_service(nsd_id)
+            return {'id': nsd_id, 'check': e}
+        except Exception as e:
+            LOG.exception(_('Deployment of service %s failed, rolling it '
+                            'back'), nsd_id)
+            # delete_service waits for the instances to go away, the
+            # request does not wait for the rollback
+            self.spawn_n(self._roll_back_service, member_context, nsd_id)
+            return {'id': nsd_id, 'check': e}
+
+
+    def _roll_back_service(self, context, nsd_id):
+        try:
+            self.delete_service(context, nsd_id)
+        except Exception:
+            LOG.exception(_('Unable to roll back service %s'), nsd_id)
+        self._discard_service(nsd_id)
+
+
+    def _discard_service(self, nsd_id):
+        ns = self.ns_dict.pop(nsd_id, None)
+        if ns and 'vnfm_dir' in ns:
+            shutil.rmtree(ns['vnfm_dir'], ignore_errors=True)
 
 
     def delete_service(self, context, service):
         nsd_id = service
         service_db_dict = self.delete_service_model(context, service)
-        try:
-            puppet_master_image = self.ns_dict[nsd_id]['nsd_template']['puppet-master']['instance_id']
-            self.novaclient.delete(puppet_master_image)
-        except Exception as e:
-            pass
         if service_db_dict is not None:
-            self._delete_vtap_and_vnfm(service_db_dict)
+            # Cleanup state is read from the DB, the service may have been
+            # deployed by another API worker
+            puppet_id = service_db_dict['service_db'][0].puppet_id
+            if puppet_id:
+                try:
+                    self.novaclient.delete(puppet_id)
+                except Exception as e:
+                    pass
+            self._delete_vtap_and_vnfm(context, nsd_id, service_db_dict)
             try:
                 self._delete_flavor_and_image(service_db_dict,service)
                 self._delete_instances(service_db_dict)
@@ -263,27 +511,52 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                 self._delete_router(service_db_dict)
                 self._delete_ports(service_db_dict)
                 self._delete_networks(service_db_dict)
-                self.delete_db_dict(context,service)
+                self.delete_db_dict(context, service, service_db_dict)
             except Exception:
                 raise
+            finally:
+                self.agent_clients.remove(topics.get_topic_for_mgr(
+                    service_db_dict['service_db'][0].vnfm_id))
         else:
             return
 
-    def _delete_vtap_and_vnfm(self, service_db_dict):
+    def _get_agent_api(self, nsd_id=None):
+        """Returns the RPC client of the VNF manager of the service.
+
+        With vnfm_shared the VNF manager of the compute host is returned.
+        """
+        if cfg.CONF.vnf.vnfm_shared:
+            vnfm_uuid = self._host_manager_uuid()
+        else:
+            vnfm_uuid = self.ns_dict[nsd_id]['vnfmanager_uuid']
+        return self.agent_clients.get(topics.get_topic_for_mgr(vnfm_uuid))
+
+    def _delete_vtap_and_vnfm(self, context, nsd_id, service_db_dict):
         try:
             vnfm_id = service_db_dict['service_db'][0].vnfm_id
             homedir = self.conf.state_path
             with open(homedir+"/"+vnfm_id+"/ovs.sh","r") as f:
                 data = f.readlines()
             subprocess.call(["sudo","ovs-vsctl","del-port",data[2].split(" ")[2]])
-            subprocess.call(["sudo","pkill","-9","vnf-manager"])
+            if cfg.CONF.vnf.vnfm_shared:
+                self._get_agent_api().remove_service(context, nsd_id=nsd_id)
+            elif self.vnfm_pool is not None:
+                # Only the VNF manager of the service is stopped, not the
+                # idle ones. An adopted one runs under its standby id.
+                standby = homedir+"/"+vnfm_id+"/standby"
+                if os.path.exists(standby):
+                    with open(standby, "r") as f:
+                        vnfm_id = f.read().strip()
+                self._stop_vnf_manager(vnfm_id)
+            else:
+                subprocess.call(["sudo","pkill","-9","vnf-manager"])
         except Exception as e:
             pass
 
     def _delete_instances(self, service_db_dict):
         instances = []
-        for instance in range(len(service_db_dict['instances'])):
-            instances.append(service_db_dict['instances'][instance][0].__dict__['instances'].split(','))
+        for vdu in service_db_dict['instances']:
+            instances.append(vdu.instances.split(','))
         for inst in instances:
             for prop in range(len(inst)):
                 try:
@@ -292,25 +565,26 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                      pass
         
     def _delete_flavor_and_image(self, service_db_dict, service):
-        nsd_id = service
-        try:
-            for image_id in self.ns_dict[nsd_id]['image_list']:
-                try:
-                    self.glanceclient.delete_image(image_id)
-                except:
-                    pass
-            for flavor_id in self.ns_dict[nsd_id]['flavor_list']:
-                try:
-                    self.novaclient.delete_flavor(flavor_id)
-                except:
-                    pass
-        except Exception as e:
-            pass
+        vdus = service_db_dict['instances']
+        for image_id in set(vdu.image for vdu in vdus
+                            if vdu.image and vdu.image_created):
+            try:
+                self.glanceclient.delete_image(image_id)
+            except:
+                pass
+        for flavor_id in set(vdu.flavor for vdu in vdus if vdu.flavor):
+            try:
+                self.novaclient.delete_flavor(flavor_id)
+            except:
+                pass
 
     def _delete_router_interfaces(self, service_db_dict):
         fixed_ips = []
         subnet_ids = []
         body = {}
+        # Empty for services failed before being deployed
+        if not service_db_dict['service_db'][0].router:
+            return
         router_id = ast.literal_eval(service_db_dict['service_db'][0].router)['id']
         router_ports = self.neutronclient.list_router_ports(router_id)
 
@@ -329,6 +603,8 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
 
     def _delete_router(self, service_db_dict):
+        if not service_db_dict['service_db'][0].router:
+            return
         router_id = ast.literal_eval(service_db_dict['service_db'][0].router)['id']
         try:
             self.neutronclient.delete_router(router_id)
@@ -337,6 +613,8 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
     
     def _delete_ports(self, service_db_dict):
+        if not service_db_dict['service_db'][0].networks:
+            return
         net_ids = ast.literal_eval(service_db_dict['service_db'][0].networks).values()
         port_list=self.neutronclient.list_ports()
 
@@ -350,6 +628,8 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
     
     def _delete_networks(self, service_db_dict):
+        if not service_db_dict['service_db'][0].networks:
+            return
         net_ids = ast.literal_eval(service_db_dict['service_db'][0].networks).values()
         for net in range(len(net_ids)):
             try:
@@ -436,8 +716,9 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
 
     def _resolve_dependency(self, context, nsd_id):
-       self.wait_for_acknowledgment(self.ns_dict[nsd_id]['dependency_list'][0],
-                                    nsd_id)
+       with self._phase(context, nsd_id, 'ack_wait:0'):
+           self.wait_for_acknowledgment(
+                  self.ns_dict[nsd_id]['dependency_list'][0], nsd_id)
        for index in range(1, len(self.ns_dict[nsd_id]['dependency_list'])):
            vdus = self.ns_dict[nsd_id]['dependency_list'][index]
            for vdu in vdus:
@@ -445,10 +726,10 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
            conf =  self._generate_vnfm_conf(nsd_id)
            for vdu in vdus:
                self.ns_dict[nsd_id]['conf_generated'].append(vdu)
-           self.agent_mapping[self.ns_dict[nsd_id]['vnfmanager_uuid']].\
-                  configure_vdus(context, conf=conf)
-           self.wait_for_acknowledgment(
-                  self.ns_dict[nsd_id]['dependency_list'][index], nsd_id)
+           self._get_agent_api(nsd_id).configure_vdus(context, conf=conf)
+           with self._phase(context, nsd_id, 'ack_wait:%d' % index):
+               self.wait_for_acknowledgment(
+                      self.ns_dict[nsd_id]['dependency_list'][index], nsd_id)
 
 
     def _get_vm_details(self, vnfd_name, vdu_name, nsd_id):
@@ -510,8 +791,11 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
     def _launch_vnfds(self, vnfd, context, nsd_id):
         vnfd_name, vdu_name = vnfd.split(':')[0],vnfd.split(':')[1]
-        vm_details = self._get_vm_details(vnfd_name, vdu_name, nsd_id)
-        vm_details['image_created'] = self._get_vm_image_details(vnfd_name,
+        with self._phase(context, nsd_id, 'flavor', vdu=vnfd):
+            vm_details = self._get_vm_details(vnfd_name, vdu_name, nsd_id)
+        with self._phase(context, nsd_id, 'image', vdu=vnfd):
+            vm_details['image_created'] = self._get_vm_image_details(
+                                                                 vnfd_name,
                                                                  vdu_name,
                                                                  nsd_id)
         vm_details['nics'] = self._get_vm_network_details(vnfd_name,
@@ -540,9 +824,15 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                                 self.ns_dict[nsd_id]['vnfds'][vnfd_name]\
                                             ['vdus'][vdu_name]['new_img'],
                                 self.ns_dict[nsd_id]['nsd_template']['vdus']\
-                                            [vnfd_name+':'+vdu_name]['id'])
-
-        deployed_vdus = self._boot_vdu(context, vnfd, nsd_id, **vm_details)
+                                            [vnfd_name+':'+vdu_name]['id'],
+                                image_created=self.ns_dict[nsd_id]['vnfds']\
+                                            [vnfd_name]['vdus'][vdu_name]\
+                                            ['new_img'] in \
+                                            self.ns_dict[nsd_id]['image_list'])
+
+        with self._phase(context, nsd_id, 'boot', vdu=vnfd):
+            deployed_vdus = self._boot_vdu(context, vnfd, nsd_id,
+                                           **vm_details)
         if type(deployed_vdus) == type([]):
             self.ns_dict[nsd_id]['vnfds'][vnfd_name]['vdus'][vdu_name]\
                         ['instances'] = deployed_vdus
@@ -562,8 +852,9 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                         ['instance_list'].append(name)
 
         self.ns_dict[nsd_id]['deployed_vdus'].append(vnfd)
-        self._set_mgmt_ip(vnfd_name, vdu_name, nsd_id)
-        self._set_instance_ip(vnfd_name, vdu_name, nsd_id)
+        with self._phase(context, nsd_id, 'ip_discovery', vdu=vnfd):
+            self._set_mgmt_ip(vnfd_name, vdu_name, nsd_id)
+            self._set_instance_ip(vnfd_name, vdu_name, nsd_id)
 
 
     def set_default_userdata(self, vm_details, nsd_id):
@@ -640,13 +931,12 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
         current_vnfs = [vdu for vdu in self.ns_dict[nsd_id]['deployed_vdus'] \
                         if vdu not in self.ns_dict[nsd_id]['conf_generated']]
         for vnf in current_vnfs:
-            if not self.is_manager_invoked:
-                vnfm_dict['service']['id'] = self.ns_dict[nsd_id]\
-                                                  ['service_name']
-                vnfm_dict['service']['fg'] = self.ns_dict[nsd_id]\
-                                             ['nsd_template']\
-                                             ['postconfigure']\
-                                             ['forwarding_graphs']
+            vnfm_dict['service']['id'] = self.ns_dict[nsd_id]\
+                                              ['service_name']
+            vnfm_dict['service']['fg'] = self.ns_dict[nsd_id]\
+                                         ['nsd_template']\
+                                         ['postconfigure']\
+                                         ['forwarding_graphs']
             vnfd_name, vdu_name = vnf.split(':')[0],vnf.split(':')[1]
             if vnfd_name  not in vnfm_dict['service'].keys(): 
                 vnfm_dict['service'][vnfd_name] = list()
@@ -662,7 +952,29 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
             vnfm_dict['service'][vnfd_name].append(vdu_dict)
             self.ns_dict[nsd_id]['conf_generated'].append(vnf)
 
-        return vnfm_dict
+        return self._vnfm_conf_delta(nsd_id, vnfm_dict)
+
+
+    def _vnfm_conf_delta(self, nsd_id, vnfm_dict):
+        """Returns the next version of the VNF manager configuration.
+
+        The configuration of a VDU is generated once, when it is deployed,
+        and is sent whole. Of the service entries (id, forwarding graph)
+        only those which changed since base_version are sent. The VNF
+        manager adds the VDUs to the configuration of base_version.
+        """
+        held = self.ns_dict[nsd_id]['vnfm_conf']
+        delta = {'nsd_id': nsd_id}
+        for key, value in vnfm_dict['service'].iteritems():
+            if key in self.ns_dict[nsd_id]['vnfds']:
+                delta[key] = value
+            elif held['service'].get(key) != value:
+                delta[key] = value
+                held['service'][key] = copy.deepcopy(value)
+        held['version'] += 1
+        return {'version': held['version'],
+                'base_version': held['version'] - 1,
+                'service': delta}
 
 
     def _boot_vdu(self, context, vnfd, nsd_id, **vm_details):
@@ -760,8 +1072,8 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
             raise
 
 
-    def get_service(self, context, service, **kwargs):
-        service = self.get_service_model(context, service, fields=None)
+    def get_service(self, context, service, fields=None, **kwargs):
+        service = self.get_service_model(context, service, fields=fields)
         return service
 
 
@@ -779,6 +1091,12 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
     def _invoke_vnf_manager(self, context, nsd_id):
         """Invokes VNFManager using ansible(if multihost)"""
+        with self._phase(context, nsd_id, 'vnfm_launch'):
+            self._launch_vnf_manager(context, nsd_id)
+        self._resolve_dependency(context, nsd_id)
+
+
+    def _launch_vnf_manager(self, context, nsd_id):
         vnfm_conf_dict = self._generate_vnfm_conf(nsd_id)
         with open(self.ns_dict[nsd_id]['vnfm_dir'] + '/' + \
                   self.ns_dict[nsd_id]['vnfmanager_uuid']+'.yaml', 'w') as f:
@@ -793,7 +1111,15 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                                            ['networks']['mgmt-if']['id'],
                                            nsd_id)
         vnfm_host =  self.novaclient.check_host(cfg.CONF.vnf.compute_hostname)
-        if cfg.CONF.vnf.vnfmconf == "local":
+        if cfg.CONF.vnf.vnfm_shared:
+            self._ensure_host_manager(vnfm_host, vnfsvc_conf)
+            self._run_ovs_script(nsd_id, ovs_path, vnfm_host)
+            self._get_agent_api(nsd_id).add_service(
+                context, nsd_id=nsd_id, conf=vnfm_conf_dict)
+        elif (cfg.CONF.vnf.vnfmconf == "local" and
+                self._adopt_idle_manager(context, nsd_id, vnfm_conf_dict)):
+            self._run_ovs_script(nsd_id, ovs_path, vnfm_host)
+        elif cfg.CONF.vnf.vnfmconf == "local":
             confcmd  = 'vnf-manager ' + \
                        '--config-file /etc/vnfsvc/vnfsvc.conf'\
                        ' --vnfm-conf-dir ' + \
@@ -809,12 +1135,10 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                                      stdout=open('/dev/null', 'w'))
 
         elif cfg.CONF.vnf.vnfmconf == "ansible":
-            with open(self.ns_dict[nsd_id]['vnfm_dir']+'/hosts', 'w') as hosts_file:
-                 hosts_file.write("[server]\n%s\n"%(vnfm_host.host_ip))
             vnfm_home_dir =  '{{ ansible_env["HOME"] }}/.vnfm/' +self.ns_dict[nsd_id]\
                                                          ['vnfmanager_uuid']
 
-            ansible_dict=[{'tasks': [
+            tasks = [
                             {'ignore_errors': True, 'shell': 'mkdir -p '+\
                           vnfm_home_dir},
                             {'copy': 'src='+ vnfsvc_conf +' dest='+\
@@ -835,33 +1159,243 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
                             {'ignore_errors': True, 'shell': 'sh '+ \
                           vnfm_home_dir + '/ovs.sh', 'register': 'result1'},
                             {'debug': 'var=result1.stdout_lines'},
-                        ], 'hosts': 'server', 'remote_user': \
-                          cfg.CONF.vnf.compute_user}]
-
-         
-            with open(self.ns_dict[nsd_id]['vnfm_dir'] +\
-                      '/vnfmanager-playbook.yaml', 'w') as yaml_file:
-                yaml_file.write( yaml.dump(ansible_dict, 
-                                           default_flow_style=False))
+                        ]
+
             LOG.debug(_('----- Launching VNFManager -----'))
+            self._run_playbook(self.ns_dict[nsd_id]['vnfm_dir'],
+                               vnfm_host, tasks)
 
-            child = pexpect.spawn('ansible-playbook ' +\
-                                  self.ns_dict[nsd_id]['vnfm_dir'] +\
-                                  '/vnfmanager-playbook.yaml -i ' +\
-                                  self.ns_dict[nsd_id]['vnfm_dir'] +\
-                                  '/hosts --ask-pass', timeout=None)
-            child.expect('SSH password:')
-            child.sendline(cfg.CONF.vnf.ssh_pwd)
-            result =  child.readlines()
-        self.agent_mapping[self.ns_dict[nsd_id]['vnfmanager_uuid']] =\
-                      VNFManagerAgentApi(topics.get_topic_for_mgr(
-                                     self.ns_dict[nsd_id]['vnfmanager_uuid']),
-                                         cfg.CONF.host, self)
+        elif cfg.CONF.vnf.vnfmconf == "ssh":
+            vnfm_home_dir = '.vnfm/' + self.ns_dict[nsd_id]['vnfmanager_uuid']
+            executor = self._get_remote_executor(vnfm_host)
+            executor.copy([vnfsvc_conf, vnfm_conf, ovs_path], vnfm_home_dir)
+            LOG.debug(_('----- Launching VNFManager -----'))
+            executor.run(self._remote_vnf_manager_cmd(
+                vnfm_home_dir, vnfsvc_conf,
+                self.ns_dict[nsd_id]['vnfmanager_uuid']))
+            executor.run('sh ' + vnfm_home_dir + '/ovs.sh',
+                         check_exit_code=False)
+        self._get_agent_api(nsd_id)
         nc = self.neutronclient
         body = {'port': {'binding:host_id': cfg.CONF.vnf.compute_hostname}}
         v_port_updated = nc.update_port(p_id,body)
-        self.is_manager_invoked = True
-        self._resolve_dependency(context, nsd_id)
+
+
+    def _run_playbook(self, workdir, vnfm_host, tasks):
+        """Runs the ansible tasks on the compute host of the VNF managers.
+
+        The playbook runs in a green subprocess, so that only the calling
+        greenthread waits for it, and its output is logged as it comes.
+        """
+        inventory = "[server]\n%s" % (vnfm_host.host_ip)
+        cmd = ['ansible-playbook', workdir + '/vnfmanager-playbook.yaml',
+               '-i', workdir + '/hosts']
+        if cfg.CONF.vnf.ssh_key_file:
+            cmd += ['--private-key', cfg.CONF.vnf.ssh_key_file]
+        elif cfg.CONF.vnf.ssh_pwd:
+            # NOTE: password logins need sshpass on this host
+            inventory += " ansible_ssh_pass=%s" % (cfg.CONF.vnf.ssh_pwd)
+        hosts_fd = os.open(workdir + '/hosts',
+                           os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(hosts_fd, 'w') as hosts_file:
+            hosts_file.write(inventory + "\n")
+        playbook = [{'tasks': tasks, 'hosts': 'server',
+                     'remote_user': cfg.CONF.vnf.compute_user}]
+        with open(workdir + '/vnfmanager-playbook.yaml', 'w') as yaml_file:
+            yaml_file.write(yaml.dump(playbook, default_flow_style=False))
+        return utils.execute_streamed(cmd,
+                                      timeout=cfg.CONF.vnf.ansible_timeout)
+
+
+    def _host_manager_uuid(self):
+        """Returns the id of the shared VNF manager of the compute host.
+
+        The id is derived from the host name so that it is the same for
+        all API workers and across restarts.
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS,
+                              cfg.CONF.vnf.compute_hostname))
+
+
+    @common_utils.synchronized('vnf-host-manager')
+    def _ensure_host_manager(self, vnfm_host, vnfsvc_conf):
+        """Starts the shared VNF manager of the host unless it is running.
+
+        The manager is started with --shared: it has no service of its own
+        and is given services with add_service/remove_service.
+        """
+        vnfm_uuid = self._host_manager_uuid()
+        if vnfm_uuid in self.host_managers:
+            return
+        # NOTE: the manager may have been started by another API worker or
+        # before a restart, it is only started if no process has its uuid.
+        if cfg.CONF.vnf.vnfmconf == "local":
+            vnfm_dir = self.conf.state_path + '/' + vnfm_uuid
+            if not os.path.exists(vnfm_dir):
+                os.makedirs(vnfm_dir)
+            confcmd = ('pgrep -f -- "--uuid %(uuid)s" > /dev/null || '
+                       'exec vnf-manager --config-file %(conf)s '
+                       '--vnfm-conf-dir %(dir)s/ --log-file %(dir)s/vnfm.log '
+                       '--uuid %(uuid)s --shared' %
+                       {'uuid': vnfm_uuid, 'conf': vnfsvc_conf,
+                        'dir': vnfm_dir})
+            subprocess.Popen(confcmd, shell=True,
+                             stderr=open('/dev/null', 'w'),
+                             stdout=open('/dev/null', 'w'))
+        elif cfg.CONF.vnf.vnfmconf == "ansible":
+            workdir = self.conf.state_path + '/' + vnfm_uuid
+            if not os.path.exists(workdir):
+                os.makedirs(workdir)
+            vnfm_home_dir = '{{ ansible_env["HOME"] }}/.vnfm/' + vnfm_uuid
+            tasks = [
+                {'ignore_errors': True, 'shell': 'mkdir -p ' + vnfm_home_dir},
+                {'copy': 'src=' + vnfsvc_conf + ' dest=' + vnfm_home_dir +
+                         '/vnfsvc.conf'},
+                {'async': 1000000, 'poll': 0, 'name': 'run manager',
+                 'shell': 'pgrep -f -- "--uuid %(uuid)s" || '
+                          'exec vnf-manager --config-file %(dir)s/vnfsvc.conf '
+                          '--vnfm-conf-dir %(dir)s/ '
+                          '--log-file %(dir)s/vnfm.log '
+                          '--uuid %(uuid)s --shared' %
+                          {'uuid': vnfm_uuid, 'dir': vnfm_home_dir}},
+            ]
+            LOG.debug(_('----- Launching shared VNFManager -----'))
+            self._run_playbook(workdir, vnfm_host, tasks)
+        elif cfg.CONF.vnf.vnfmconf == "ssh":
+            vnfm_home_dir = '.vnfm/' + vnfm_uuid
+            executor = self._get_remote_executor(vnfm_host)
+            executor.copy([vnfsvc_conf], vnfm_home_dir)
+            LOG.debug(_('----- Launching shared VNFManager -----'))
+            executor.run('pgrep -f -- "--uuid %s" > /dev/null || %s' % (
+                vnfm_uuid, self._remote_vnf_manager_cmd(
+                    vnfm_home_dir, vnfsvc_conf, vnfm_uuid, '--shared')))
+        self.host_managers.add(vnfm_uuid)
+
+
+    def _start_idle_manager(self, standby_id):
+        """Starts a VNF manager of the pool and waits until it is ready."""
+        vnfm_dir = self.conf.state_path + '/' + standby_id
+        if not os.path.exists(vnfm_dir):
+            os.makedirs(vnfm_dir)
+        proc = subprocess.Popen(['vnf-manager',
+                                 '--config-file', cfg.CONF.config_file[0],
+                                 '--vnfm-conf-dir', vnfm_dir + '/',
+                                 '--log-file', vnfm_dir + '/vnfm.log',
+                                 '--uuid', standby_id, '--standby'],
+                                stderr=open('/dev/null', 'w'),
+                                stdout=open('/dev/null', 'w'))
+        agent_api = VNFManagerAgentApi(topics.get_topic_for_mgr(standby_id),
+                                       cfg.CONF.host, self)
+        admin_context = context.get_admin_context_without_session()
+        deadline = common_utils.monotonic() + \
+                   self.conf.vnf.vnfm_start_timeout
+        while True:
+            try:
+                agent_api.ping(admin_context, timeout=2)
+                return
+            except v_rpc.MessagingTimeout:
+                if (proc.poll() is not None or
+                        common_utils.monotonic() > deadline):
+                    self._stop_vnf_manager(standby_id)
+                    raise exceptions.VNFManagerNotReady(vnfm_id=standby_id)
+
+
+    def _adopt_idle_manager(self, context, nsd_id, vnfm_conf_dict):
+        """Hands the service over to an idle VNF manager of the pool.
+
+        Returns False when no idle VNF manager took it, the VNF manager of
+        the service has then to be started.
+        """
+        if self.vnfm_pool is None:
+            return False
+        standby_id = self.vnfm_pool.claim()
+        if standby_id is None:
+            return False
+        standby_topic = topics.get_topic_for_mgr(standby_id)
+        try:
+            # A call, so that the VNF manager consumes the topic of the
+            # service before configure_vdus is cast to it.
+            self.agent_clients.get(standby_topic).adopt_service(
+                context, uuid=self.ns_dict[nsd_id]['vnfmanager_uuid'],
+                conf_dir=self.ns_dict[nsd_id]['vnfm_dir'],
+                conf=vnfm_conf_dict)
+        except v_rpc.RPCException:
+            LOG.exception(_('Idle VNF manager %(standby)s did not take '
+                            'service %(nsd_id)s'),
+                          {'standby': standby_id, 'nsd_id': nsd_id})
+            self._stop_vnf_manager(standby_id)
+            return False
+        finally:
+            self.agent_clients.remove(standby_topic)
+        with open(self.ns_dict[nsd_id]['vnfm_dir'] + '/standby', 'w') as f:
+            f.write(standby_id)
+        return True
+
+
+    def _stop_vnf_manager(self, vnfm_id):
+        subprocess.call(["sudo", "pkill", "-9", "-f", "--",
+                         "--uuid " + vnfm_id])
+
+
+    def _run_ovs_script(self, nsd_id, ovs_path, vnfm_host):
+        """Plugs the management port of the service on the compute host."""
+        if cfg.CONF.vnf.vnfmconf == "local":
+            subprocess.Popen('sudo sh ' + ovs_path, shell=True)
+        elif cfg.CONF.vnf.vnfmconf == "ansible":
+            vnfm_home_dir = '{{ ansible_env["HOME"] }}/.vnfm/' + \
+                            self.ns_dict[nsd_id]['vnfmanager_uuid']
+            tasks = [
+                {'ignore_errors': True, 'shell': 'mkdir -p ' + vnfm_home_dir},
+                {'copy': 'src=' + ovs_path + ' dest=' + vnfm_home_dir +
+                         '/ovs.sh'},
+                {'ignore_errors': True, 'shell': 'sh ' + vnfm_home_dir +
+                                                 '/ovs.sh'},
+            ]
+            self._run_playbook(self.ns_dict[nsd_id]['vnfm_dir'], vnfm_host,
+                               tasks)
+        elif cfg.CONF.vnf.vnfmconf == "ssh":
+            vnfm_home_dir = '.vnfm/' + self.ns_dict[nsd_id]['vnfmanager_uuid']
+            executor = self._get_remote_executor(vnfm_host)
+            executor.copy([ovs_path], vnfm_home_dir)
+            executor.run('sh ' + vnfm_home_dir + '/ovs.sh',
+                         check_exit_code=False)
+
+
+    def _get_remote_executor(self, vnfm_host):
+        """Returns the executor of the compute host, kept for reuse.
+
+        With remote_executor ssh, the SSH connection to the host stays open
+        so that the launches following the first one skip the handshake.
+        """
+        executor = self.remote_executors.get(vnfm_host.host_ip)
+        if executor is not None:
+            return executor
+        if self.conf.vnf.remote_executor == 'local':
+            executor = remote.LocalExecutor(
+                timeout=self.conf.vnf.ssh_command_timeout)
+        else:
+            control_dir = self.conf.state_path + '/ssh'
+            if not os.path.exists(control_dir):
+                os.makedirs(control_dir, 0o700)
+            executor = remote.SSHExecutor(
+                vnfm_host.host_ip, self.conf.vnf.compute_user, control_dir,
+                key_file=self.conf.vnf.ssh_key_file or None,
+                password=self.conf.vnf.ssh_pwd or None,
+                persist=self.conf.vnf.ssh_control_persist,
+                timeout=self.conf.vnf.ssh_command_timeout)
+        self.remote_executors[vnfm_host.host_ip] = executor
+        return executor
+
+
+    def _remote_vnf_manager_cmd(self, vnfm_home_dir, vnfsvc_conf, vnfm_uuid,
+                                *args):
+        """Returns the shell command starting a VNF manager in background."""
+        return ('nohup vnf-manager --config-file %(dir)s/%(conf)s '
+                '--vnfm-conf-dir %(dir)s/ --log-file %(dir)s/vnfm.log '
+                '--uuid %(uuid)s %(args)s > /dev/null 2>&1 &' %
+                {'dir': vnfm_home_dir,
+                 'conf': os.path.basename(vnfsvc_conf),
+                 'uuid': vnfm_uuid, 'args': ' '.join(args)})
 
 
     def _create_ovs_script(self, mgmt_id, nsd_id):
@@ -889,30 +1423,56 @@ class VNFPlugin(vnf_db.NetworkServicePluginDb):
 
 
     def build_acknowledge_list(self, context, vnfd_name, vdu_name, instance, status, nsd_id):
-        vdu = vnfd_name+':'+vdu_name
-        if status == 'ERROR':
-            self.update_nsd_status(context, nsd_id, 'ERROR')
-            raise exceptions.ConfigurationError
-        else:
-            #check whether the key exists or not
-            if self.ns_dict[nsd_id]['acknowledge_list'].get(vdu, None):
-                self.ns_dict[nsd_id]['acknowledge_list'][vdu].append(instance)
+        self.build_acknowledge_lists(context, nsd_id,
+                                     [(vnfd_name, vdu_name, instance, status)])
+
+
+    def build_acknowledge_lists(self, context, nsd_id, acks):
+        """Records a batch of (vnfd, vdu, instance, status) acks.
+
+        Acks are grouped per VDU, so the acknowledge list and the
+        completion of each VDU are updated once, and an error updates the
+        service status once. The other acks of a batch with an error are
+        recorded before ConfigurationError is raised.
+        """
+        instances = OrderedDict()
+        failed = False
+        for vnfd_name, vdu_name, instance, status in acks:
+            if status == 'ERROR':
+                failed = True
             else:
-                self.ns_dict[nsd_id]['acknowledge_list'][vdu] = [instance]
+                instances.setdefault((vnfd_name, vdu_name),
+                                     []).append(instance)
+
+        for (vnfd_name, vdu_name), vdu_acks in instances.iteritems():
+            vdu = vnfd_name+':'+vdu_name
+            acknowledged = self.ns_dict[nsd_id]['acknowledge_list'].\
+                                setdefault(vdu, [])
+            # Acks resent by the VNF manager are counted once
+            acknowledged.extend(instance for instance in vdu_acks
+                                if instance not in acknowledged)
 
             # Check whether all the instances of a specific VDU 
             # are acknowledged
             vdu_instances = len(self.ns_dict[nsd_id]['vnfds'] \
                                 [vnfd_name]['vdus'][vdu_name]['instances'])
-            current_instances = len(self.ns_dict[nsd_id] \
-                                    ['acknowledge_list'][vdu])
-            if vdu_instances == current_instances:
+            if (vdu_instances == len(acknowledged) and
+                    vdu not in self.ns_dict[nsd_id]['created']):
                 self.ns_dict[nsd_id]['created'].append(vdu)
 
+        if failed:
+            self.update_nsd_status(context, nsd_id, 'ERROR')
+            raise exceptions.ConfigurationError()
+
  
 class VNFManagerAgentApi(v_rpc.RpcProxy):
     """Plugin side of plugin to agent RPC API."""
 
+    # API version history:
+    #     1.0 - Initial version.
+    #     1.1 - Added add_service and remove_service, for VNF managers
+    #           serving several services.
+    #     1.2 - Added ping and adopt_service, for idle VNF managers.
     API_VERSION = '1.0'
 
     def __init__(self, topic, host, plugin):
@@ -924,25 +1484,87 @@ class VNFManagerAgentApi(v_rpc.RpcProxy):
     def configure_vdus(self, context, conf):
         return self.cast(
             context,
-            self.make_msg('configure_vdus', conf=conf),
+            self.make_msg('configure_vdus', conf=v_rpc.compress(conf)),
+        )
+
+    def add_service(self, context, nsd_id, conf):
+        return self.cast(
+            context,
+            self.make_msg('add_service', nsd_id=nsd_id,
+                          conf=v_rpc.compress(conf)),
+            version='1.1',
+        )
+
+    def remove_service(self, context, nsd_id):
+        return self.cast(
+            context,
+            self.make_msg('remove_service', nsd_id=nsd_id),
+            version='1.1',
+        )
+
+    def ping(self, context, timeout=None):
+        return self.call(
+            context,
+            self.make_msg('ping'),
+            version='1.2', timeout=timeout,
+        )
+
+    def adopt_service(self, context, uuid, conf_dir, conf):
+        return self.call(
+            context,
+            self.make_msg('adopt_service', uuid=uuid, conf_dir=conf_dir,
+                          conf=conf),
+            version='1.2',
+        )
+
+
+class VNFPluginApi(v_rpc.RpcProxy):
+    """Plugin side of the API worker to API worker RPC API."""
+
+    API_VERSION = '1.2'
+
+    def __init__(self, topic):
+        super(VNFPluginApi, self).__init__(topic, self.API_VERSION)
+
+    def forward_acks(self, context, nsd_id, acks):
+        return self.fanout_cast(
+            context,
+            self.make_msg('send_acks', nsd_id=nsd_id, acks=acks,
+                          forwarded=True),
         )
 
 
 class VNFManagerCallbacks(v_rpc.RpcCallback):
-    RPC_API_VERSION = '1.0'
+    # API version history:
+    #     1.0 - Initial version.
+    #     1.1 - send_ack: added forwarded, set on acks relayed between
+    #           API workers.
+    #     1.2 - Added send_acks, acknowledging a batch of instances.
+    RPC_API_VERSION = '1.2'
 
     def __init__(self, plugin):
         super(VNFManagerCallbacks, self).__init__()
         self.plugin = plugin
 
-    def send_ack(self, context, vnfd, vdu, instance, status, nsd_id):
-        if status == 'COMPLETE':
-            self.plugin.build_acknowledge_list(context, vnfd, vdu, instance,
-                                               status, nsd_id)
-            LOG.debug(_('ACK received from VNFManager: '
-                        'Configuration complete for VNF %s'), instance)
-        else:
-            self.plugin.build_acknowledge_list(context,vnfd, vdu, instance,
-                                               status, nsd_id)
-            LOG.debug(_('ACK received from VNFManager: '
-                        'Confguration failed for VNF %s'), instance)
+    def send_ack(self, context, vnfd, vdu, instance, status, nsd_id,
+                 forwarded=False):
+        self.send_acks(context, nsd_id, [(vnfd, vdu, instance, status)],
+                       forwarded=forwarded)
+
+    def send_acks(self, context, nsd_id, acks, forwarded=False):
+        """Acknowledges a list of [vnfd, vdu, instance, status] entries."""
+        if nsd_id not in self.plugin.ns_dict:
+            # The service is being deployed by another API worker
+            if not forwarded and cfg.CONF.api_workers > 0:
+                self.plugin.plugin_api.forward_acks(context, nsd_id, acks)
+            else:
+                LOG.debug(_('Ignoring ACK for unknown service %s'), nsd_id)
+            return
+        for vnfd, vdu, instance, status in acks:
+            if status == 'COMPLETE':
+                LOG.debug(_('ACK received from VNFManager: '
+                            'Configuration complete for VNF %s'), instance)
+            else:
+                LOG.debug(_('ACK received from VNFManager: '
+                            'Confguration failed for VNF %s'), instance)
+        self.plugin.build_acknowledge_lists(context, nsd_id, acks)
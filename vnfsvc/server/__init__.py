@@ -18,6 +18,7 @@
 # If ../vnfsvc/__init__.py exists, add ../ to Python search path, so that
 # it will override what happens to be installed in /usr/(local/)lib/python...
 
+import signal
 import sys
 
 import eventlet
@@ -26,9 +27,16 @@ eventlet.monkey_patch()
 from oslo.config import cfg
 
 from vnfsvc.common import config
+from vnfsvc import manager
 from vnfsvc import service
 from vnfsvc.openstack.common.gettextutils import _
 
+def _sigterm(signo, frame):
+    # Exits through the finally clause of main. With API workers the
+    # process launcher installs its own handlers.
+    sys.exit(0)
+
+
 def main():
     # the configuration will be read into the cfg.CONF global data structure
     config.init(sys.argv[1:])
@@ -36,6 +44,7 @@ def main():
         sys.exit(_("ERROR: Unable to find configuration file via the default"
                    " search paths (~/.vnfsvc/, ~/, /etc/vnfsvc/, /etc/) and"
                    " the '--config-file' option!"))
+    signal.signal(signal.SIGTERM, _sigterm)
     try:
         pool = eventlet.GreenPool()
 
@@ -47,6 +56,9 @@ def main():
         pass
     except RuntimeError as e:
         sys.exit(_("ERROR: %s") % e)
+    finally:
+        # API workers stop the plugin they loaded themselves
+        manager.VNFSvcManager.stop_plugin()
 
 
 if __name__ == "__main__":
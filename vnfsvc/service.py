@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import inspect
 import logging as std_logging
 import os
@@ -109,12 +110,19 @@ def serve_wsgi(cls):
 
 
 def _run_wsgi(app_name):
-    app = config.load_paste_app(app_name)
-    if not app:
-        LOG.error(_('No known API applications configured.'))
-        return
+    workers = cfg.CONF.api_workers
+    if workers < 1:
+        app = config.load_paste_app(app_name)
+        if not app:
+            LOG.error(_('No known API applications configured.'))
+            return
+    else:
+        # The application, and with it the plugin and its RPC consumers,
+        # is loaded by every worker process after the fork.
+        app = functools.partial(config.load_paste_app, app_name)
     server = wsgi.Server("vnfsvc")
-    server.start(app, cfg.CONF.bind_port, cfg.CONF.bind_host)
+    server.start(app, cfg.CONF.bind_port, cfg.CONF.bind_host,
+                 workers=workers)
     # Dump all option values here after all options are parsed
     cfg.CONF.log_opt_values(LOG, std_logging.DEBUG)
     LOG.info(_("VNF service started, listening on %(host)s:%(port)s"),
@@ -0,0 +1,65 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import unittest
+
+import webob.exc
+
+from vnfsvc.api.v2 import base
+from vnfsvc import context
+
+ATTR_INFO = {
+    'id': {'allow_post': False, 'allow_put': False,
+           'validate': {'type:uuid': None}, 'is_visible': True},
+    'tenant_id': {'allow_post': True, 'allow_put': False,
+                  'validate': {'type:string': None}, 'is_visible': True},
+    'name': {'allow_post': True, 'allow_put': True,
+             'validate': {'type:string': None}, 'is_visible': True,
+             'default': ''},
+}
+
+
+class TestPrepareRequestBody(unittest.TestCase):
+
+    def setUp(self):
+        super(TestPrepareRequestBody, self).setUp()
+        self.context = context.Context('user', 'tenant')
+
+    def _prepare(self, body, allow_bulk=True):
+        return base.Controller.prepare_request_body(
+            self.context, body, True, 'service', ATTR_INFO,
+            allow_bulk=allow_bulk)
+
+    def test_bulk_accepts_empty_item(self):
+        body = self._prepare({'services': [{}, {'name': 'second'}]})
+        self.assertEqual(
+            {'services': [{'service': {'tenant_id': 'tenant', 'name': ''}},
+                          {'service': {'tenant_id': 'tenant',
+                                       'name': 'second'}}]},
+            body)
+
+    def test_bulk_requires_resources(self):
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self._prepare, {'services': []})
+
+    def test_bulk_not_allowed(self):
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self._prepare, {'services': [{}]},
+                          allow_bulk=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from vnfsvc import context
+from vnfsvc.db import api as db_api
+from vnfsvc.db import model_base
+from vnfsvc.db.vnf import vnf_db
+
+SERVICE_ID = 'c2a6d7e4-1b5f-4f0e-9d38-6a2f1e0b7c11'
+
+
+class TestReaderSession(unittest.TestCase):
+    """Reads of a context go to the replica until the context writes."""
+
+    def setUp(self):
+        super(TestReaderSession, self).setUp()
+        self.primary = self._create_engine()
+        self.replica = self._create_engine()
+
+        def get_session(autocommit=True, expire_on_commit=False,
+                        use_slave=False):
+            engine = self.replica if use_slave else self.primary
+            return orm.sessionmaker(bind=engine, autocommit=autocommit,
+                                    expire_on_commit=expire_on_commit)()
+
+        self.addCleanup(setattr, db_api, 'get_session', db_api.get_session)
+        db_api.get_session = get_session
+        self.context = context.Context('user', 'tenant', is_admin=True)
+        self.plugin = vnf_db.NetworkServicePluginDb()
+
+    def _create_engine(self):
+        engine = sa.create_engine('sqlite://')
+        model_base.BASEV2.metadata.create_all(engine)
+        engine.execute(vnf_db.NetworkService.__table__.insert(),
+                       id=SERVICE_ID, tenant_id='tenant', vnfm_id='',
+                       vdus='{}', networks='', subnets='', router='',
+                       service_type='service', status='ACTIVE')
+        return engine
+
+    def test_etag_revision_does_not_pin_reads_to_primary(self):
+        # GET computes the ETag from the primary before reading the service
+        self.assertEqual(
+            1, self.plugin.get_service_revision(self.context, SERVICE_ID))
+        self.plugin.get_service_model(self.context, SERVICE_ID)
+        self.assertIs(self.replica, self.context.reader_session.bind)
+
+    def test_write_pins_reads_to_primary(self):
+        self.plugin.update_nsd_status(self.context, SERVICE_ID, 'ERROR')
+        self.assertIs(self.context.session, self.context.reader_session)
+        self.assertEqual(
+            'ERROR',
+            self.plugin.get_service_model(self.context, SERVICE_ID)['status'])
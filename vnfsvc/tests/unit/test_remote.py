@@ -0,0 +1,71 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from vnfsvc.agent.linux import remote
+from vnfsvc.agent.linux import utils
+
+
+class TestSSHExecutorMaster(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSSHExecutorMaster, self).setUp()
+        control_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, control_dir)
+        self.executor = remote.SSHExecutor('host', 'user', control_dir)
+        self.commands = []
+        self.master_alive = True
+        self.addCleanup(setattr, utils, 'execute_streamed',
+                        utils.execute_streamed)
+        utils.execute_streamed = self._execute_streamed
+
+    def _execute_streamed(self, cmd, timeout=None, addl_env=None,
+                          check_exit_code=True):
+        self.commands.append(cmd)
+        if '-O' in cmd and not self.master_alive:
+            raise RuntimeError('Control socket connect: Connection refused')
+        return []
+
+    def _create_socket(self):
+        open(self.executor._control_path, 'w').close()
+
+    def _started_master(self):
+        return any('-M' in cmd for cmd in self.commands)
+
+    def test_running_master_is_reused(self):
+        self._create_socket()
+        self.executor._start_master()
+        self.assertFalse(self._started_master())
+
+    def test_stale_socket_is_replaced(self):
+        self._create_socket()
+        self.master_alive = False
+        self.executor._start_master()
+        self.assertFalse(os.path.exists(self.executor._control_path))
+        self.assertTrue(self._started_master())
+
+    def test_master_started_without_socket(self):
+        self.executor._start_master()
+        self.assertEqual(1, len(self.commands))
+        self.assertTrue(self._started_master())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import base64
+import json
+import unittest
+import zlib
+
+from oslo.config import cfg
+
+from vnfsvc.common import rpc
+from vnfsvc.common import rpc_instrumentation
+from vnfsvc.common import topics
+from vnfsvc import context
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.cleaned_up = False
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+class FakeRPCClient(object):
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def prepare(self, **kwargs):
+        return self
+
+
+class TestRpcProxyClose(unittest.TestCase):
+
+    def setUp(self):
+        super(TestRpcProxyClose, self).setUp()
+        self.transport = FakeTransport()
+        self.addCleanup(setattr, rpc, 'TRANSPORT', rpc.TRANSPORT)
+        self.addCleanup(setattr, rpc, 'get_client', rpc.get_client)
+        rpc.TRANSPORT = self.transport
+
+    def _proxy(self, transport):
+        rpc.get_client = lambda target, version_cap=None: (
+            FakeRPCClient(transport))
+        proxy = rpc.RpcProxy('topic', '1.0')
+        proxy._prepared[(('version', '1.1'),)] = proxy._client
+        return proxy
+
+    def test_close_keeps_shared_transport(self):
+        proxy = self._proxy(self.transport)
+        proxy.close()
+        self.assertIsNone(proxy._client)
+        self.assertEqual({}, proxy._prepared)
+        self.assertFalse(self.transport.cleaned_up)
+
+    def test_close_cleans_up_own_transport(self):
+        own_transport = FakeTransport()
+        self._proxy(own_transport).close()
+        self.assertTrue(own_transport.cleaned_up)
+        self.assertFalse(self.transport.cleaned_up)
+
+
+class TestCompress(unittest.TestCase):
+
+    conf = {'service': {'nsd_id': 'id', 'vnfd': [{'name': 'vdu'}] * 20}}
+
+    def _set_min_size(self, size):
+        cfg.CONF.set_override('rpc_compress_min_size', size)
+        self.addCleanup(cfg.CONF.clear_override, 'rpc_compress_min_size')
+
+    def test_disabled(self):
+        self._set_min_size(0)
+        self.assertIs(self.conf, rpc.compress(self.conf))
+
+    def test_small_entity_is_sent_as_is(self):
+        self._set_min_size(1 << 20)
+        self.assertIs(self.conf, rpc.compress(self.conf))
+
+    def test_large_entity_is_compressed(self):
+        self._set_min_size(16)
+        compressed = rpc.compress(self.conf)
+        self.assertEqual([rpc.COMPRESSED_KEY], list(compressed))
+        self.assertEqual(self.conf, json.loads(zlib.decompress(
+            base64.b64decode(compressed[rpc.COMPRESSED_KEY]))))
+
+
+class TestSendTimeStamp(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSendTimeStamp, self).setUp()
+        self.context = context.Context('user', 'tenant')
+
+    def _serialized_context(self, topic):
+        serializer = rpc.RequestContextSerializer(
+            stamp=topic in rpc.STAMPED_TOPICS)
+        return serializer.serialize_context(self.context)
+
+    def test_plugin_topics_are_stamped(self):
+        for topic in (topics.PLUGIN, topics.PLUGIN_CONTROL):
+            self.assertIn(rpc_instrumentation.SENT_AT,
+                          self._serialized_context(topic))
+
+    def test_vnf_manager_topics_are_not_stamped(self):
+        topic = topics.get_topic_for_mgr('uuid')
+        self.assertNotIn(rpc_instrumentation.SENT_AT,
+                         self._serialized_context(topic))
+
+    def test_deserialize_drops_stamp(self):
+        serializer = rpc.RequestContextSerializer(stamp=True)
+        ctxt = serializer.deserialize_context(
+            serializer.serialize_context(self.context))
+        self.assertNotIn(rpc_instrumentation.SENT_AT, ctxt.to_dict())
+
+
+class FakeProxy(object):
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestClientPool(unittest.TestCase):
+
+    def setUp(self):
+        super(TestClientPool, self).setUp()
+        self.created = []
+
+        def factory(topic):
+            proxy = FakeProxy(topic)
+            self.created.append(proxy)
+            return proxy
+
+        self.pool = rpc.ClientPool(2, factory)
+
+    def test_get_reuses_proxy(self):
+        self.assertIs(self.pool.get('a'), self.pool.get('a'))
+        self.assertEqual(1, len(self.created))
+
+    def test_eviction_closes_least_recently_used(self):
+        a = self.pool.get('a')
+        b = self.pool.get('b')
+        self.pool.get('a')
+        c = self.pool.get('c')
+        self.assertTrue(b.closed)
+        self.assertFalse(a.closed)
+        self.assertFalse(c.closed)
+        self.assertNotIn('b', self.pool)
+        self.assertEqual(2, len(self.pool))
+
+    def test_remove_closes_proxy(self):
+        a = self.pool.get('a')
+        self.pool.remove('a')
+        self.assertTrue(a.closed)
+        self.assertNotIn('a', self.pool)
+        # Removing an unknown topic is a no-op
+        self.pool.remove('a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# Copyright 2014 Tata Consultancy Services Ltd.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import unittest
+
+from vnfsvc.common import vnfm_pool
+from vnfsvc import manager
+from vnfsvc import wsgi
+
+
+class TestJSONDictSerializer(unittest.TestCase):
+
+    def setUp(self):
+        super(TestJSONDictSerializer, self).setUp()
+        self.serializer = wsgi.JSONDictSerializer()
+        self.serializer.chunk_size = 16
+
+    def _services(self, count):
+        return [{'id': str(i), 'name': 'service-%d' % i}
+                for i in range(count)]
+
+    def test_serialize_iter_consumes_generator_lazily(self):
+        consumed = []
+
+        def rows():
+            for service in self._services(10):
+                consumed.append(service['id'])
+                yield service
+
+        chunks = self.serializer.serialize_iter({'services': rows()})
+        next(chunks)
+        self.assertTrue(len(consumed) < 10)
+        body = ''.join(chunks)
+        self.assertEqual(10, len(consumed))
+        self.assertTrue(body.endswith(']}'))
+
+    def test_serialize_iter_matches_serialize(self):
+        data = {'services': self._services(5)}
+        streamed = ''.join(self.serializer.serialize_iter(
+            {'services': (s for s in data['services'])}))
+        self.assertEqual(data, json.loads(streamed))
+        self.assertEqual(
+            data, json.loads(''.join(self.serializer.serialize_iter(data))))
+
+    def test_serialize_iter_empty_generator(self):
+        streamed = ''.join(self.serializer.serialize_iter(
+            {'services': (s for s in [])}))
+        self.assertEqual({'services': []}, json.loads(streamed))
+
+
+class FakePlugin(object):
+
+    def __init__(self, pool):
+        self.vnfm_pool = pool
+
+    def stop(self):
+        self.vnfm_pool.close()
+
+
+class FakeManager(object):
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+
+class TestWorkerServiceStop(unittest.TestCase):
+    """Stopping an API worker stops the idle VNF managers of its plugin."""
+
+    def setUp(self):
+        super(TestWorkerServiceStop, self).setUp()
+        self.stopped = []
+        self.pool = vnfm_pool.VNFManagerPool(2, lambda standby_id: None,
+                                             self.stopped.append)
+        self.pool._idle.extend(['standby-1', 'standby-2'])
+        self.addCleanup(manager.VNFSvcManager.clear_instance)
+        self.worker = wsgi.WorkerService(None, None)
+
+    def test_stop_closes_vnfm_pool(self):
+        manager.VNFSvcManager._instance = FakeManager(FakePlugin(self.pool))
+        self.worker.stop()
+        self.assertEqual(['standby-1', 'standby-2'], self.stopped)
+        self.assertEqual(0, len(self.pool))
+        # A closed pool is not refilled
+        self.pool.refill()
+        self.assertEqual(0, len(self.pool))
+
+    def test_stop_without_plugin(self):
+        manager.VNFSvcManager.clear_instance()
+        self.worker.stop()
+        self.assertEqual([], self.stopped)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,14 +19,18 @@ Utility methods for working with WSGI servers
 from __future__ import print_function
 
 import errno
+import json
 import os
 import socket
 import ssl
 import sys
 import time
+import types
+import weakref
 from xml.etree import ElementTree as etree
 from xml.parsers import expat
 
+import eventlet.greenthread
 import eventlet.wsgi
 eventlet.patcher.monkey_patch(all=False, socket=True, thread=True)
 from oslo.config import cfg
@@ -36,11 +40,15 @@ import webob.exc
 
 from vnfsvc.common import constants
 from vnfsvc.common import exceptions as exception
+from vnfsvc.common import rpc as n_rpc
 from vnfsvc import context
+from vnfsvc.db import api as db_api
+from vnfsvc import manager
 from vnfsvc.openstack.common import excutils
 from vnfsvc.openstack.common import gettextutils
 from vnfsvc.openstack.common import jsonutils
 from vnfsvc.openstack.common import log as logging
+from vnfsvc.openstack.common import service as common_service
 from vnfsvc.openstack.common import systemd
 from vnfsvc.openstack.common.gettextutils import _
 
@@ -79,6 +87,45 @@ CONF.register_opts(socket_opts)
 
 LOG = logging.getLogger(__name__)
 
+# Servers created in this process, reported by the API metrics
+_servers = weakref.WeakSet()
+
+
+def get_servers():
+    return list(_servers)
+
+
+class WorkerService(common_service.Service):
+    """Serves the API of a Server in a forked worker process."""
+
+    def __init__(self, service, app_loader):
+        super(WorkerService, self).__init__()
+        self._service = service
+        self._app_loader = app_loader
+        self._server = None
+
+    def start(self):
+        # The engine facade and the RPC transport were possibly created
+        # before the fork, their connections must not be shared with the
+        # parent or the other workers.
+        db_api.reset()
+        n_rpc.init(CONF)
+        application = self._app_loader()
+        self._server = self._service.pool.spawn(self._service._run,
+                                                application,
+                                                self._service._socket)
+
+    def wait(self):
+        if isinstance(self._server, eventlet.greenthread.GreenThread):
+            self._server.wait()
+
+    def stop(self):
+        if isinstance(self._server, eventlet.greenthread.GreenThread):
+            self._server.kill()
+            self._server = None
+        manager.VNFSvcManager.stop_plugin()
+        super(WorkerService, self).stop()
+
 
 class Server(object):
     """Server class to manage multiple WSGI sockets and applications."""
@@ -90,6 +137,7 @@ class Server(object):
         self.name = name
         self._launcher = None
         self._server = None
+        _servers.add(self)
 
     def _get_socket(self, host, port, backlog):
         bind_addr = (host, port)
@@ -168,8 +216,14 @@ class Server(object):
 
         return sock
 
-    def start(self, application, port, host='0.0.0.0'):#, workers=0):
-        """Run a WSGI server with the given application."""
+    def start(self, application, port, host='0.0.0.0', workers=0):
+        """Run a WSGI server with the given application.
+
+        :param workers: number of worker processes to fork, all accepting
+                        on the same socket. With workers, application is a
+                        callable returning the WSGI application; it is
+                        called in each worker after the fork.
+        """
         self._host = host
         self._port = port
         backlog = CONF.backlog
@@ -178,9 +232,16 @@ class Server(object):
                                         self._port,
                                         backlog=backlog)
 
-        self._server = self.pool.spawn(self._run, application,
-                                       self._socket)
-        systemd.notify_once()
+        if workers < 1:
+            self._server = self.pool.spawn(self._run, application,
+                                           self._socket)
+            systemd.notify_once()
+        else:
+            # Pooled connections must not be inherited by the workers
+            db_api.dispose()
+            self._launcher = common_service.ProcessLauncher()
+            self._launcher.launch_service(WorkerService(self, application),
+                                          workers=workers)
 
     @property
     def host(self):
@@ -352,13 +413,55 @@ class DictSerializer(ActionDispatcher):
         return ""
 
 
+def _sanitizer(obj):
+    return unicode(obj)
+
+
+# NOTE: API results are plain dicts, lists and strings built by the plugin,
+# they are encoded by a single C accelerated encoder. Objects json does not
+# know are rendered as unicode, as jsonutils.to_primitive is not needed.
+_json_encoder = json.JSONEncoder(check_circular=False, default=_sanitizer)
+
+
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization."""
 
+    # Bytes of encoded collection items buffered before being sent
+    chunk_size = 65536
+
     def default(self, data):
-        def sanitizer(obj):
-            return unicode(obj)
-        return jsonutils.dumps(data, default=sanitizer)
+        return _json_encoder.encode(data)
+
+    def serialize_iter(self, data):
+        """Encode data incrementally, yielding chunks of the JSON document.
+
+        The items of list and generator values, such as the resources of
+        a collection, are encoded one at a time so the whole document is
+        never held in memory.
+        """
+        if not isinstance(data, dict):
+            yield self.default(data)
+            return
+        encode = _json_encoder.encode
+        buf = []
+        size = 0
+        for index, (key, value) in enumerate(data.iteritems()):
+            buf.append('%s%s: ' % (', ' if index else '{', encode(key)))
+            if not isinstance(value, (list, types.GeneratorType)):
+                buf.append(encode(value))
+                continue
+            buf.append('[')
+            for item_index, item in enumerate(value):
+                chunk = encode(item)
+                buf.append(', ' + chunk if item_index else chunk)
+                size += len(chunk)
+                if size >= self.chunk_size:
+                    yield ''.join(buf)
+                    buf = []
+                    size = 0
+            buf.append(']')
+        buf.append('}' if data else '{}')
+        yield ''.join(buf)
 
 
 class XMLDictSerializer(DictSerializer):